@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+#
+# Helpers shared by the benchmarks: the logChecker module (lc), the peak memory of the process, and
+# the synthetic parsed tables of makeData.
+#
+
+import os
+import random
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.logChecker import logChecker as lc
+
+def peakRss():
+	"""
+	Peak resident memory of the process, in MB. Only available on Linux and macOS.
+	"""
+
+	try:
+		import resource
+	except ImportError:
+		return float('nan')
+
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+	return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+def makeData(rows, templates, changes, seed=1):
+	"""
+	Builds datosEquipoPre, datosEquipoPost and dTmplt with `rows` parsed rows in total, split in
+	`templates` templates. A fraction `changes` of the post rows is modified.
+	"""
+
+	rnd       = random.Random(seed)
+	perTmplt  = rows // templates
+	columns   = ['Port','Admin','Oper','Mtu','Descr']
+
+	datosEquipoPre  = {}
+	datosEquipoPost = {}
+	dTmplt          = {}
+
+	for t in range(templates):
+		tmpltName = f'bench_{t}.template'
+
+		dfPre = pd.DataFrame({
+			'NAME':  [f'rtr{i // 50}' for i in range(perTmplt)],
+			'Port':  [f'1/1/{i % 50}' for i in range(perTmplt)],
+			'Admin': ['Up'] * perTmplt,
+			'Oper':  ['Up'] * perTmplt,
+			'Mtu':   ['9212'] * perTmplt,
+			'Descr': [f'port {i}' for i in range(perTmplt)],
+		})
+		dfPost = dfPre.copy()
+
+		idx = rnd.sample(range(perTmplt), int(perTmplt * changes))
+		dfPost.loc[idx, 'Oper'] = 'Down'
+
+		for d, df in [(datosEquipoPre, dfPre), (datosEquipoPost, dfPost)]:
+			d[tmpltName] = dict(
+				dfResultDatos = df,
+				command       = 'show port',
+				template      = tmpltName,
+				valueKeys     = ['Port'],
+				parseStatus   = 'ok',
+			)
+
+		dTmplt[tmpltName] = dict(
+			filterColumns = columns,
+			majorDown     = ['down','dwn'],
+			valueKeys     = ['Port'],
+		)
+
+	return datosEquipoPre, datosEquipoPost, dTmplt
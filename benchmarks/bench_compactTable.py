@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+#
+# Memory benchmark of compactTable: memory of the parsed pre and post tables of synthetic logs
+# (genLogs.py), with the router id and the low cardinality columns stored as categoricals (as
+# parseResults leaves them), and with all of them as strings (as before). Also the time of
+# searchDiffAll + findMajor on both.
+#
+# python benchmarks/bench_compactTable.py -r 1000 -c 10 -n 50
+#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchCommon import lc
+from genLogs import makeLogs
+
+def tableMemory(datosEquipo):
+	"""
+	Memory of the tables of datosEquipo, in MB, counting the strings (deep).
+	"""
+
+	return sum([datosEquipo[x]['dfResultDatos'].memory_usage(deep=True).sum() for x in datosEquipo.keys()]) / 1024 / 1024
+
+def asStrings(datosEquipo):
+	"""
+	Copy of datosEquipo with the categorical columns as strings.
+	"""
+
+	dOut = {}
+
+	for tmpltName in datosEquipo.keys():
+		df = datosEquipo[tmpltName]['dfResultDatos']
+
+		dOut[tmpltName] = dict(datosEquipo[tmpltName])
+		dOut[tmpltName]['dfResultDatos'] = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+	return dOut
+
+def compare(datosEquipoPre, datosEquipoPost, dTmplt):
+	"""
+	Seconds of searchDiffAll + findMajor.
+	"""
+
+	t0        = time.perf_counter()
+	count_dif = lc.searchDiffAll(datosEquipoPre, datosEquipoPost, dTmplt, 'name', False)
+	lc.findMajor(count_dif, dTmplt, 'name', datosEquipoPre)
+
+	return time.perf_counter() - t0
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='Memory benchmark of compactTable')
+	parser1.add_argument('-r', '--routers',  type=int,   default=200,  help='Number of routers, per side. Default=200.')
+	parser1.add_argument('-c', '--commands', type=int,   default=10,   help='Number of commands with template, per router. Default=10.')
+	parser1.add_argument('-n', '--rows',     type=int,   default=50,   help='Rows of the output of each command. Default=50.')
+	parser1.add_argument('-x', '--changes',  type=float, default=0.05, help='Fraction of rows changed in post. Default=0.05.')
+	parser1.add_argument('-g', '--general',  type=int,   default=1,    help='Number of commands without template, per router. Default=1.')
+	args = parser1.parse_args()
+
+	with tempfile.TemporaryDirectory() as folder:
+		dFolders = makeLogs(folder, args.routers, args.commands, args.rows, args.changes, args.general)
+		dTmplt   = lc.readTemplate('', dFolders['Templates'], 'textFSM')
+
+		datosEquipoPre  = lc.parseResults(dTmplt, lc.readLog(dFolders['pre'], True), dFolders['Templates'], 'textFSM', 'name')
+		datosEquipoPost = lc.parseResults(dTmplt, lc.readLog(dFolders['post'], True), dFolders['Templates'], 'textFSM', 'name')
+
+	strPre  = asStrings(datosEquipoPre)
+	strPost = asStrings(datosEquipoPost)
+
+	rows    = sum([len(datosEquipoPre[x]['dfResultDatos']) + len(datosEquipoPost[x]['dfResultDatos']) for x in datosEquipoPre.keys()])
+	nCat    = sum([(datosEquipoPre[x]['dfResultDatos'].dtypes == 'category').sum() for x in datosEquipoPre.keys()])
+	nCols   = sum([len(datosEquipoPre[x]['dfResultDatos'].columns) for x in datosEquipoPre.keys()])
+
+	print(f'\nrouters={args.routers} commands={args.commands} rows={args.rows} parsed rows={rows} categorical columns={nCat} of {nCols}')
+	print(f"{'tables':<14}{'memory MB':>11}{'compare s':>11}")
+	print(f"{'strings':<14}{tableMemory(strPre) + tableMemory(strPost):>11.1f}{compare(strPre, strPost, dTmplt):>11.3f}")
+	print(f"{'categoricals':<14}{tableMemory(datosEquipoPre) + tableMemory(datosEquipoPost):>11.1f}{compare(datosEquipoPre, datosEquipoPost, dTmplt):>11.3f}")
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+#
+# Benchmark of constructExcel: time to generate the Excel report of a synthetic
+# pre/post comparison, with a given number of parsed rows and changes.
+#
+# python benchmarks/bench_constructExcel.py -r 1000000 -t 10 -c 0.05
+#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchCommon import lc, makeData, peakRss
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='constructExcel benchmark')
+	parser1.add_argument('-r', '--rows',      type=int,   default=1000000, help='Total number of parsed rows, per side. Default=1000000.')
+	parser1.add_argument('-t', '--templates', type=int,   default=10,      help='Number of templates (sheets). Default=10.')
+	parser1.add_argument('-c', '--changes',   type=float, default=0.05,    help='Fraction of rows changed in post. Default=0.05.')
+	parser1.add_argument('-lm','--lowMemory', type=str,   default='no', choices=['yes','no'], help='Use the low memory mode of constructExcel. Default=no.')
+	args = parser1.parse_args()
+
+	datosEquipoPre, datosEquipoPost, dTmplt = makeData(args.rows, args.templates, args.changes)
+
+	count_dif   = lc.searchDiffAll(datosEquipoPre, datosEquipoPost, dTmplt, 'name', False)
+	searchMajor = lc.findMajor(count_dif, dTmplt, 'name', datosEquipoPre)
+	df_final    = lc.makeTable(datosEquipoPre, datosEquipoPost)
+
+	rssBefore = peakRss()
+
+	with tempfile.TemporaryDirectory() as folder:
+		t0 = time.perf_counter()
+		lc.constructExcel(df_final, count_dif, searchMajor, os.path.join(folder, 'bench/'), args.lowMemory == 'yes')
+		t1 = time.perf_counter()
+		size = os.path.getsize(os.path.join(folder, 'bench.xlsx'))
+
+	print(f'\nrows={args.rows} templates={args.templates} changes={args.changes} lowMemory={args.lowMemory}')
+	print(f'constructExcel: {t1-t0:.2f} seconds, {size/1024/1024:.1f} MB')
+	print(f'peak RSS: {rssBefore:.0f} MB before constructExcel, {peakRss():.0f} MB after')
+
+if __name__ == '__main__':
+	main()
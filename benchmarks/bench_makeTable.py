@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Memory benchmark of makeTable + constructExcel: peak RSS of the report of a synthetic
+# pre/post comparison, writing the pre and post blocks directly (current makeTable), and
+# building first the side-by-side table with pd.concat (as makeTable did before).
+# Each mode runs in its own process, so peak RSS values are not mixed.
+#
+# python benchmarks/bench_makeTable.py -r 1000000 -t 10 -lm yes
+#
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchCommon import lc, makeData, peakRss
+
+def concatTable(datosEquipoPre, datosEquipoPost):
+	"""
+	makeTable as it was before: the pre and post tables are concatenated side by side. The
+	concatenated table is kept until the report is written, as before, while constructExcel
+	writes the blocks of the original tables (writeTable no longer takes several levels of columns).
+	"""
+
+	df_all = {}
+
+	for tmpltName in datosEquipoPre.keys():
+		dfPre  = datosEquipoPre[tmpltName]['dfResultDatos'].reset_index(drop=True)
+		dfPost = datosEquipoPost[tmpltName]['dfResultDatos'].reset_index(drop=True)
+
+		df_all[tmpltName] = dict(
+			dfConcat      = pd.concat([dfPre, dfPost], axis=1, keys=('Pre-Check', 'Post-Check')),
+			dfResultDatos = [('Pre-Check', datosEquipoPre[tmpltName]['dfResultDatos']), ('Post-Check', datosEquipoPost[tmpltName]['dfResultDatos'])],
+			parseStatus   = datosEquipoPost[tmpltName]['parseStatus'],
+			command       = datosEquipoPre[tmpltName]['command'],
+		)
+
+	return df_all
+
+def runMode(args):
+	"""
+	Generates the report with the mode args.mode, and prints the peak RSS before and after.
+	"""
+
+	datosEquipoPre, datosEquipoPost, dTmplt = makeData(args.rows, args.templates, args.changes)
+
+	count_dif   = lc.searchDiffAll(datosEquipoPre, datosEquipoPost, dTmplt, 'name', False)
+	searchMajor = lc.findMajor(count_dif, dTmplt, 'name', datosEquipoPre)
+
+	rssBefore = peakRss()
+
+	with tempfile.TemporaryDirectory() as folder:
+		t0 = time.perf_counter()
+
+		if args.mode == 'concat':
+			df_final = concatTable(datosEquipoPre, datosEquipoPost)
+		else:
+			df_final = lc.makeTable(datosEquipoPre, datosEquipoPost)
+
+		lc.constructExcel(df_final, count_dif, searchMajor, os.path.join(folder, 'bench/'), args.lowMemory == 'yes')
+		t1 = time.perf_counter()
+
+	rssAfter = peakRss()
+
+	print(f'RESULT {args.mode}: {t1-t0:.2f} seconds, peak RSS {rssBefore:.0f} MB before makeTable, {rssAfter:.0f} MB after (+{rssAfter-rssBefore:.0f} MB)')
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='makeTable memory benchmark')
+	parser1.add_argument('-r', '--rows',      type=int,   default=1000000, help='Total number of parsed rows, per side. Default=1000000.')
+	parser1.add_argument('-t', '--templates', type=int,   default=10,      help='Number of templates (sheets). Default=10.')
+	parser1.add_argument('-c', '--changes',   type=float, default=0.05,    help='Fraction of rows changed in post. Default=0.05.')
+	parser1.add_argument('-lm','--lowMemory', type=str,   default='yes', choices=['yes','no'], help='Use the low memory mode of constructExcel. Default=yes.')
+	parser1.add_argument('-m', '--mode',      type=str,   default='both', choices=['both','blocks','concat'], help='blocks: current makeTable; concat: side-by-side table built with pd.concat. Default=both.')
+	args = parser1.parse_args()
+
+	print(f'\nrows={args.rows} templates={args.templates} changes={args.changes} lowMemory={args.lowMemory}')
+
+	if args.mode != 'both':
+		runMode(args)
+		return
+
+	for mode in ['concat','blocks']:
+		cmd = [sys.executable, os.path.abspath(__file__), '-r', str(args.rows), '-t', str(args.templates), '-c', str(args.changes), '-lm', args.lowMemory, '-m', mode]
+		out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+		print('\n'.join(line[7:] for line in out.splitlines() if line.startswith('RESULT ')))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the stages of fncRun (pre/post comparison), on synthetic logs written by genLogs.py:
+# time, throughput and peak memory of readTemplate, readLog, parseResults, searchDiffAll, findMajor,
+# makeTable, constructExcel and renderAtp. With several numbers of routers, each one is run in its
+# own process, so the peak memory of a run doesn't include the previous ones.
+#
+# python benchmarks/bench_stages.py -r 10 100 1000 -c 10 -n 50
+# python benchmarks/bench_stages.py -r 100 -te ttp -o results.json
+#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchCommon import lc, peakRss
+from genLogs import makeLogs
+
+STAGES = ['readTemplate','readLog','parseResults','searchDiffAll','findMajor','makeTable','constructExcel','renderAtp']
+
+def runStages(args, routers, folder):
+	"""
+	Generates the logs of `routers` routers inside folder, and runs the stages of fncRun on them.
+
+	Returns:
+		dict with the parameters of the run and, per stage, seconds, routers/s, rows/s and peak RSS (MB)
+	"""
+
+	general  = args.general if args.templateEngine == 'textFSM' else 0 # ttp has no general template
+	dFolders = makeLogs(folder, routers, args.commands, args.rows, args.changes, general)
+
+	templateFolder = dFolders['Templates'] if args.templateEngine == 'textFSM' else dFolders['TemplatesTTP']
+	routerId       = 'name'
+	dStages        = {}
+
+	def stage(name, fn, *fnArgs):
+		t0     = time.perf_counter()
+		result = fn(*fnArgs)
+		t1     = time.perf_counter()
+
+		dStages[name] = dict(seconds = dStages.get(name, {}).get('seconds', 0) + t1 - t0, peakRss_MB = peakRss())
+
+		return result
+
+	dTmplt   = stage('readTemplate', lc.readTemplate, '', templateFolder, args.templateEngine)
+
+	# readLog returns a generator: the logs are loaded here, so that parseResults only parses
+	lLogPre  = stage('readLog', lambda: list(lc.readLog(dFolders['pre'], True)))
+	lLogPost = stage('readLog', lambda: list(lc.readLog(dFolders['post'], True)))
+
+	datosEquipoPre  = stage('parseResults', lc.parseResults, dTmplt, lLogPre, templateFolder, args.templateEngine, routerId, args.workers)
+	datosEquipoPost = stage('parseResults', lc.parseResults, dTmplt, lLogPost, templateFolder, args.templateEngine, routerId, args.workers)
+
+	lLogPre  = None
+	lLogPost = None
+
+	count_dif   = stage('searchDiffAll', lc.searchDiffAll, datosEquipoPre, datosEquipoPost, dTmplt, routerId, False)
+	searchMajor = stage('findMajor', lc.findMajor, count_dif, dTmplt, routerId, datosEquipoPre)
+	df_final    = stage('makeTable', lc.makeTable, datosEquipoPre, datosEquipoPost)
+
+	stage('constructExcel', lc.constructExcel, df_final, count_dif, searchMajor, dFolders['post'], args.lowMemory == 'yes')
+
+	if args.genAtp == 'yes':
+		dictParam = dict(
+			preFolder  = dFolders['pre'],
+			postFolder = dFolders['post'],
+			workers    = args.workers,
+			atpSplit   = 'no',
+			atpSize    = 20,
+		)
+
+		cwd = os.getcwd()
+		os.chdir(folder) # ATP.docx is written in the current folder
+		try:
+			stage('renderAtp', lc.renderAtp, dictParam)
+		finally:
+			os.chdir(cwd)
+
+	rows = sum([len(datosEquipoPre[x]['dfResultDatos']) + len(datosEquipoPost[x]['dfResultDatos']) for x in datosEquipoPre.keys()])
+
+	for name, dStage in dStages.items():
+		dStage['routers_s'] = 2 * routers / dStage['seconds'] if dStage['seconds'] > 0 else float('inf')
+		dStage['rows_s']    = rows / dStage['seconds'] if dStage['seconds'] > 0 else float('inf')
+
+	return dict(
+		routers        = routers,
+		commands       = args.commands,
+		rows           = args.rows,
+		parsedRows     = rows,
+		templateEngine = args.templateEngine,
+		workers        = args.workers,
+		stages         = {x: dStages[x] for x in STAGES if x in dStages},
+		seconds        = sum([x['seconds'] for x in dStages.values()]),
+		peakRss_MB     = peakRss(),
+	)
+
+def printRun(dRun):
+	"""
+	Prints the results of a run.
+	"""
+
+	print(f"\nrouters={dRun['routers']} commands={dRun['commands']} rows={dRun['rows']} parsed rows={dRun['parsedRows']} engine={dRun['templateEngine']} workers={dRun['workers']}")
+	print(f"{'stage':<16}{'seconds':>10}{'routers/s':>12}{'rows/s':>12}{'peak RSS MB':>13}")
+
+	for name, dStage in dRun['stages'].items():
+		print(f"{name:<16}{dStage['seconds']:>10.3f}{dStage['routers_s']:>12.0f}{dStage['rows_s']:>12.0f}{dStage['peakRss_MB']:>13.0f}")
+
+	print(f"{'total':<16}{dRun['seconds']:>10.3f}{2 * dRun['routers'] / dRun['seconds']:>12.0f}{dRun['parsedRows'] / dRun['seconds']:>12.0f}{dRun['peakRss_MB']:>13.0f}")
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='Benchmark of the stages of logChecker')
+	parser1.add_argument('-r', '--routers',  type=int,   default=[10, 100], nargs='+', help='Number of routers, per side. Several values can be given. Default=10 100.')
+	parser1.add_argument('-c', '--commands', type=int,   default=10,   help='Number of commands with template, per router. Default=10.')
+	parser1.add_argument('-n', '--rows',     type=int,   default=50,   help='Rows of the output of each command. Default=50.')
+	parser1.add_argument('-x', '--changes',  type=float, default=0.05, help='Fraction of rows changed in post. Default=0.05.')
+	parser1.add_argument('-g', '--general',  type=int,   default=1,    help='Number of commands without template, per router (textFSM only). Default=1.')
+	parser1.add_argument('-te','--templateEngine', type=str, default='textFSM', choices=['textFSM','ttp'], help='Template engine. Default=textFSM.')
+	parser1.add_argument('-w', '--workers',  type=int,   default=1,    help='Workers of parseResults and renderAtp. Default=1.')
+	parser1.add_argument('-lm','--lowMemory', type=str,  default='no', choices=['yes','no'], help='Low memory mode of constructExcel. Default=no.')
+	parser1.add_argument('-ga','--genAtp',   type=str,   default='yes', choices=['yes','no'], help='Include renderAtp. Default=yes.')
+	parser1.add_argument('-o', '--output',   type=str,   default='',   help='JSON file where the results are written.')
+	args = parser1.parse_args()
+
+	lRuns = []
+
+	if len(args.routers) == 1:
+		with tempfile.TemporaryDirectory() as folder:
+			dRun = runStages(args, args.routers[0], folder)
+		print('RESULT ' + json.dumps(dRun))
+		lRuns.append(dRun)
+	else:
+		for routers in args.routers:
+			cmd  = [sys.executable, os.path.abspath(__file__), '-r', str(routers), '-c', str(args.commands), '-n', str(args.rows), '-x', str(args.changes), '-g', str(args.general),
+					'-te', args.templateEngine, '-w', str(args.workers), '-lm', args.lowMemory, '-ga', args.genAtp]
+			out  = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+			lRuns += [json.loads(line[7:]) for line in out.splitlines() if line.startswith('RESULT ')]
+
+	for dRun in lRuns:
+		printRun(dRun)
+
+	if args.output != '':
+		with open(args.output, 'w') as f:
+			json.dump(lRuns, f, indent=2)
+
+if __name__ == '__main__':
+	main()
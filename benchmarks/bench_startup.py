@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the startup of logChecker: wall time of several kinds of runs, import time of the
+# modules (python -X importtime), and the heavy modules (pandas, textfsm, ttp, docx, lxml) each run
+# loads. A run must not load the modules of the code paths it doesn't use: with --check, the script
+# fails if a run loads a module it shouldn't (see SCENARIOS).
+#
+# python benchmarks/bench_startup.py
+# python benchmarks/bench_startup.py -n 10 -o startup.json --check
+#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from genLogs import makeLogs
+
+LOGCHECKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'logChecker', 'logChecker.py')
+
+HEAVY = ['pandas','textfsm','ttp','docx','lxml']
+
+# Runs of logChecker: arguments (folders of makeLogs between braces) and heavy modules they may load
+SCENARIOS = [
+	dict(name = 'version',         args = ['-v'],                                                                          allowed = []),
+	dict(name = 'help',            args = ['-h'],                                                                          allowed = []),
+	dict(name = 'assess textFSM',  args = ['-pre', '{pre}', '-tf', '{Templates}'],                                         allowed = ['pandas','textfsm']),
+	dict(name = 'prepost textFSM', args = ['-pre', '{pre}', '-post', '{post}', '-tf', '{Templates}'],                      allowed = ['pandas','textfsm']),
+	dict(name = 'prepost ttp',     args = ['-pre', '{pre}', '-post', '{post}', '-tf', '{TemplatesTTP}', '-te', 'ttp'],     allowed = ['pandas','textfsm','ttp']),
+	dict(name = 'prepost ATP',     args = ['-pre', '{pre}', '-post', '{post}', '-tf', '{Templates}', '-ga', 'yes'],        allowed = ['pandas','textfsm','docx','lxml']),
+]
+
+def importTimes(stderr):
+	"""
+	Import time of the modules, from the output of python -X importtime. A module loaded lazily
+	(see lazyImport) has no entry of its own: its submodules are imported at the top level.
+
+	Returns:
+		dict top level module: cumulative import time, in seconds; and set of all the imported modules
+	"""
+
+	dTimes   = {}
+	sModules = set()
+
+	for line in stderr.splitlines():
+		if not line.startswith('import time:') or 'cumulative' in line:
+			continue
+
+		_, cumulative, name = line.split('|')
+
+		sModules.add(name.strip().split('.')[0])
+
+		if not name.startswith('  '): # Top level: one space after the bar
+			dTimes[name.strip()] = int(cumulative) / 1e6
+
+	return dTimes, sModules
+
+def heavyTime(dTimes, module):
+	"""
+	Import time of module and its submodules imported at the top level.
+	"""
+
+	return sum([s for x, s in dTimes.items() if x == module or x.startswith(module + '.')])
+
+def runScenario(scenario, dFolders, repeat):
+	"""
+	Runs logChecker with the arguments of scenario, repeat times, inside the folder of the logs.
+
+	Returns:
+		dict with the best and median wall time, the total import time and the heavy modules loaded
+	"""
+
+	cmd   = [sys.executable, LOGCHECKER] + [x.format(**dFolders) for x in scenario['args']]
+	lWall = []
+
+	for i in range(repeat):
+		t0 = time.perf_counter()
+		subprocess.run(cmd, capture_output=True, text=True, cwd=dFolders['folder'])
+		lWall.append(time.perf_counter() - t0)
+
+	out              = subprocess.run([sys.executable, '-X', 'importtime'] + cmd[1:], capture_output=True, text=True, cwd=dFolders['folder'])
+	dTimes, sModules = importTimes(out.stderr)
+	lWall            = sorted(lWall)
+
+	return dict(
+		name     = scenario['name'],
+		best_s   = lWall[0],
+		median_s = lWall[len(lWall) // 2],
+		import_s = sum(dTimes.values()),
+		heavy    = {x: heavyTime(dTimes, x) for x in HEAVY if x in sModules},
+		extra    = [x for x in HEAVY if x in sModules and x not in scenario['allowed']],
+	)
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='Benchmark of the startup of logChecker')
+	parser1.add_argument('-n', '--repeat',  type=int, default=5,  help='Runs of each scenario. Default=5.')
+	parser1.add_argument('-o', '--output',  type=str, default='', help='JSON file where the results are written.')
+	parser1.add_argument('--check',         action='store_true',  help='Fails if a run loads a heavy module that its code path does not use.')
+	args = parser1.parse_args()
+
+	lRuns = []
+
+	with tempfile.TemporaryDirectory() as folder:
+		dFolders = makeLogs(folder, routers=2, commands=3, rows=5, changes=0.2, general=0)
+		dFolders['folder'] = folder
+
+		for scenario in SCENARIOS:
+			lRuns.append(runScenario(scenario, dFolders, args.repeat))
+
+	print(f"{'scenario':<18}{'best s':>9}{'median s':>10}{'import s':>10}  heavy modules (import s)")
+
+	for dRun in lRuns:
+		heavy = ', '.join([f'{x} ({s:.3f})' for x, s in dRun['heavy'].items()])
+		print(f"{dRun['name']:<18}{dRun['best_s']:>9.3f}{dRun['median_s']:>10.3f}{dRun['import_s']:>10.3f}  {heavy}")
+
+	if args.output != '':
+		with open(args.output, 'w') as f:
+			json.dump(lRuns, f, indent=2)
+
+	lExtra = [(x['name'], x['extra']) for x in lRuns if len(x['extra']) > 0]
+
+	if args.check and len(lExtra) > 0:
+		for name, extra in lExtra:
+			print(f'{name}: loads {extra}, not used by its code path')
+		sys.exit(1)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+#
+# Check of diffLines and diffGeneral. diffLines is compared with a brute force LCS on random
+# sequences: its blocks must turn a into b, and the number of deleted and inserted lines must be the
+# minimum one. The cap of DIFF_MAX_EDITS is also checked: above it, the lines left are a single block.
+# diffGeneral is checked on a small case, with changed, deleted and inserted lines, and routers
+# present only in pre or only in post.
+#
+# python benchmarks/check_diffLines.py -n 3000
+#
+
+import argparse
+import os
+import random
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchCommon import lc
+
+def lcsLength(a, b):
+	"""
+	Length of the longest common subsequence of a and b (dynamic programming).
+	"""
+
+	prev = [0] * (len(b) + 1)
+
+	for x in a:
+		cur = [0]
+		for j, y in enumerate(b):
+			cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+		prev = cur
+
+	return prev[-1]
+
+def checkBlocks(a, b, blocks):
+	"""
+	Checks that blocks (see diffLines) are ordered, and that the lines outside them are equal in a and b.
+
+	Returns:
+		number of deleted plus inserted lines, or None if the blocks are wrong.
+	"""
+
+	i, j  = 0, 0
+	edits = 0
+
+	for i1, i2, j1, j2 in blocks + [(len(a), len(a), len(b), len(b))]:
+		if i1 < i or j1 < j or i2 < i1 or j2 < j1 or i1 - i != j1 - j or a[i:i1] != b[j:j1]:
+			return None
+		edits += (i2 - i1) + (j2 - j1)
+		i, j   = i2, j2
+
+	return edits
+
+def checkRandom(nCases):
+	"""
+	diffLines vs a brute force LCS on nCases random pairs of sequences. Returns the number of errors.
+	"""
+
+	rng    = random.Random(0)
+	errors = 0
+
+	for case in range(nCases):
+		symbols = rng.randint(1, 5)
+		a = [rng.randrange(symbols) for x in range(rng.randint(0, 30))]
+		b = [rng.randrange(symbols) for x in range(rng.randint(0, 30))]
+
+		if rng.random() < 0.3:
+			# Mostly equal sequences, as the logs of the same router usually are
+			b = list(a)
+			for x in range(rng.randint(1, 4)):
+				pos = rng.randint(0, len(b))
+				if rng.random() < 0.5 and pos < len(b):
+					del b[pos]
+				else:
+					b.insert(pos, rng.randrange(symbols + 1))
+
+		blocks = lc.diffLines(a, b)
+		edits  = checkBlocks(a, b, blocks)
+
+		if edits is None or edits != len(a) + len(b) - 2 * lcsLength(a, b):
+			print(f'diffLines error: a={a} b={b} blocks={blocks}')
+			errors += 1
+
+	return errors
+
+def checkMaxEdits():
+	"""
+	With more than DIFF_MAX_EDITS lines deleted and inserted, diffLines reports the lines left, after
+	the common start and end, as a single block. Returns the number of errors.
+	"""
+
+	errors   = 0
+	maxEdits = lc.DIFF_MAX_EDITS
+
+	try:
+		lc.DIFF_MAX_EDITS = 5
+
+		a = ['h1','h2'] + [f'a{x}' for x in range(10)] + ['t1']
+		b = ['h1','h2'] + [f'b{x}' for x in range(8)]  + ['t1']
+
+		if lc.diffLines(a, b) != [(2, 12, 2, 10)]:
+			print(f'diffLines error above DIFF_MAX_EDITS: {lc.diffLines(a, b)}')
+			errors += 1
+
+		# Up to DIFF_MAX_EDITS, the diff is still the minimum one
+		a = ['x','y','z','w']
+		b = ['x','Y','z','w','v']
+		blocks = lc.diffLines(a, b)
+
+		if checkBlocks(a, b, blocks) != 3:
+			print(f'diffLines error below DIFF_MAX_EDITS: {blocks}')
+			errors += 1
+
+		# Random sequences with the cap: the blocks must still turn a into b
+		rng = random.Random(1)
+		for case in range(500):
+			a = [rng.randrange(3) for x in range(rng.randint(0, 30))]
+			b = [rng.randrange(3) for x in range(rng.randint(0, 30))]
+
+			if checkBlocks(a, b, lc.diffLines(a, b)) is None:
+				print(f'diffLines error with DIFF_MAX_EDITS: a={a} b={b}')
+				errors += 1
+	finally:
+		lc.DIFF_MAX_EDITS = maxEdits
+
+	return errors
+
+def checkGeneral():
+	"""
+	diffGeneral on a small case. Returns the number of errors.
+	"""
+
+	dfPre = pd.DataFrame(dict(
+		NAME  = ['r1','r1','r1','r1','r1','r2','r2','r4'],
+		Lines = ['a','b','c','d','e','x','y','same'],
+	))
+	dfPost = pd.DataFrame(dict(
+		NAME  = ['r1','r1','r1','r1','r1','r3','r4'],
+		Lines = ['a','B','c','e','f','z','same'],
+	))
+
+	expected = [
+		('r1', 'b', lc.PRE,  'changed',  1),
+		('r1', 'B', lc.POST, 'changed',  1),
+		('r1', 'd', lc.PRE,  'deleted',  3),
+		('r1', 'f', lc.POST, 'inserted', 4),
+		('r2', 'x', lc.PRE,  'deleted',  5),
+		('r2', 'y', lc.PRE,  'deleted',  6),
+		('r3', 'z', lc.POST, 'inserted', 5),
+	]
+
+	dfDiff = lc.diffGeneral(dfPre, dfPost, 'NAME')
+	result = list(dfDiff[['NAME','Lines','Where',lc.CHANGE,lc.IDX_PRE_POST]].itertuples(index=False, name=None))
+
+	if result != expected:
+		print(f'diffGeneral error:\n{dfDiff}')
+		return 1
+
+	return 0
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='Check of diffLines and diffGeneral')
+	parser1.add_argument('-n', '--cases', type=int, default=3000, help='Number of random cases compared with the brute force LCS. Default=3000.')
+	args = parser1.parse_args()
+
+	errors = checkRandom(args.cases) + checkMaxEdits() + checkGeneral()
+
+	print(f'diffLines: {args.cases} random cases, DIFF_MAX_EDITS, diffGeneral: {errors} errors')
+
+	sys.exit(1 if errors > 0 else 0)
+
+if __name__ == '__main__':
+	main()
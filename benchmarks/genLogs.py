@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+#
+# Generator of synthetic taskAutom logs (*rx.json), for the benchmarks of logChecker.
+# Writes, inside the output folder:
+#
+#   pre/            one rtrNNNNNrx.json per router, with the outputs of the commands
+#   post/           the same logs, with a fraction of the rows changed
+#   Templates/      one textFSM template per command
+#   TemplatesTTP/   one ttp template per command
+#
+# python benchmarks/genLogs.py -o /tmp/bench -r 100 -c 10 -n 50 -x 0.05
+#
+
+import argparse
+import json
+import os
+import random
+
+# Kinds of SR OS commands: base command, textFSM values, ttp line, and function returning the
+# columns of each row (router, row, changed).
+KINDS = [
+	dict(
+		command  = 'show port',
+		values   = ['Value Required Port (\\S+)', 'Value Admin (Up|Down)', 'Value Link (Yes|No)', 'Value Oper (Up|Down)', 'Value Mtu (\\d+)', 'Value Descr (.*)'],
+		columns  = ['Port','Admin','Link','Oper','Mtu','Descr'],
+		rule     = '^${Port}\\s+${Admin}\\s+${Link}\\s+${Oper}\\s+${Mtu}\\s+${Descr}$$ -> Record',
+		ttp      = '{{ Port }} {{ Admin }} {{ Link }} {{ Oper }} {{ Mtu }} {{ Descr | ORPHRASE }}',
+		row      = lambda r, i, changed: [f'{i // 48 + 1}/{i // 24 % 2 + 1}/{i % 24 + 1}', 'Up', 'No' if changed else 'Yes', 'Down' if changed else 'Up', '9212', f'to-rtr{(r + i) % 1000} port {i}'],
+	),
+	dict(
+		command  = 'show router interface',
+		values   = ['Value Required Iface (\\S+)', 'Value Adm (Up|Down)', 'Value Opr (\\S+)', 'Value Mode (\\S+)', 'Value Port (\\S+)'],
+		columns  = ['Iface','Adm','Opr','Mode','Port'],
+		rule     = '^${Iface}\\s+${Adm}\\s+${Opr}\\s+${Mode}\\s+${Port} -> Record',
+		ttp      = '{{ Iface }} {{ Adm }} {{ Opr }} {{ Mode }} {{ Port }}',
+		row      = lambda r, i, changed: [f'to-rtr{(r + i) % 1000}-{i}', 'Up', 'Down/Down' if changed else 'Up/Up', 'Network', f'1/1/{i % 24 + 1}:{i}'],
+	),
+	dict(
+		command  = 'show service sap-using',
+		values   = ['Value Required Sap (\\S+)', 'Value SvcId (\\d+)', 'Value Ingress (\\d+)', 'Value Egress (\\d+)', 'Value Adm (Up|Down)', 'Value Opr (Up|Down)'],
+		columns  = ['Sap','SvcId','Ingress','Egress','Adm','Opr'],
+		rule     = '^${Sap}\\s+${SvcId}\\s+${Ingress}\\s+${Egress}\\s+${Adm}\\s+${Opr} -> Record',
+		ttp      = '{{ Sap }} {{ SvcId }} {{ Ingress }} {{ Egress }} {{ Adm }} {{ Opr }}',
+		row      = lambda r, i, changed: [f'lag-{i % 64 + 1}:{i}', str(1000 + i), '1', '1', 'Up', 'Down' if changed else 'Up'],
+	),
+]
+
+GENERAL_COMMANDS = ['show system information', 'show card state', 'show chassis environment', 'show log log-id 99']
+
+def commandName(c):
+	"""
+	Command number c: the base command of its kind, and the number of the command.
+	"""
+
+	kind = KINDS[c % len(KINDS)]
+
+	return kind, f"{kind['command']} {c}"
+
+def writeTemplates(folder, commands):
+	"""
+	Writes a textFSM (Templates/) and a ttp (TemplatesTTP/) template for each command.
+	"""
+
+	os.makedirs(os.path.join(folder, 'Templates'), exist_ok=True)
+	os.makedirs(os.path.join(folder, 'TemplatesTTP'), exist_ok=True)
+
+	for c in range(commands):
+		kind, command = commandName(c)
+
+		with open(os.path.join(folder, 'Templates', f'bench_{c:03d}.template'), 'w') as f:
+			f.write(f'#Command: {command}$\n#Timos: any\n#majorDown: Fail\n')
+			f.write('\n'.join(kind['values']) + '\n\nStart\n  ' + kind['rule'] + '\n')
+
+		with open(os.path.join(folder, 'TemplatesTTP', f'bench_{c:03d}.ttp'), 'w') as f:
+			f.write(f"#Command: {command}$\n#Columns: {','.join(kind['columns'])}\n#majorDown: Fail\n")
+			f.write('<group name="rows" method="table">\n' + kind['ttp'] + '\n</group>\n')
+
+def writeLogs(folder, routers, commands, rows, changes, general, seed):
+	"""
+	Writes the pre and post logs of `routers` routers, each one with the output of `commands` commands
+	of `rows` rows, plus `general` commands without template. A fraction `changes` of the post rows is changed.
+	"""
+
+	rnd = random.Random(seed)
+
+	for side in ['pre','post']:
+		os.makedirs(os.path.join(folder, side), exist_ok=True)
+
+	for r in range(routers):
+		dLog = {
+			'pre':  {'name': f'rtr{r:05d}', 'ip': f'10.{r // 65536}.{r // 256 % 256}.{r % 256}'},
+			'post': {'name': f'rtr{r:05d}', 'ip': f'10.{r // 65536}.{r // 256 % 256}.{r % 256}'},
+		}
+
+		for c in range(commands):
+			kind, command = commandName(c)
+
+			for side in ['pre','post']:
+				lines = []
+				for i in range(rows):
+					changed = side == 'post' and rnd.random() < changes
+					lines.append('  '.join(kind['row'](r, i, changed)))
+				dLog[side][command] = '\n' + '\n'.join(lines) + '\n'
+
+		for g in range(general):
+			command = GENERAL_COMMANDS[g % len(GENERAL_COMMANDS)] + ('' if g < len(GENERAL_COMMANDS) else f' {g}')
+			for side in ['pre','post']:
+				uptime = r if side == 'pre' else r + 1
+				dLog[side][command] = f'\nSystem Name : rtr{r:05d}\nUp Time : {uptime} days\nOper Status : up\n'
+
+		for side in ['pre','post']:
+			with open(os.path.join(folder, side, f'rtr{r:05d}rx.json'), 'w') as f:
+				json.dump(dLog[side], f)
+
+def makeLogs(folder, routers=10, commands=10, rows=50, changes=0.05, general=1, seed=1):
+	"""
+	Writes the synthetic logs and templates inside folder. See writeLogs.
+
+	Returns:
+		dict with the folders pre, post, Templates and TemplatesTTP (ending in /)
+	"""
+
+	writeTemplates(folder, commands)
+	writeLogs(folder, routers, commands, rows, changes, general, seed)
+
+	return {x: os.path.join(folder, x) + '/' for x in ['pre','post','Templates','TemplatesTTP']}
+
+def main():
+
+	parser1 = argparse.ArgumentParser(description='Generator of synthetic taskAutom logs and templates')
+	parser1.add_argument('-o', '--output',   type=str,   required=True, help='Output folder.')
+	parser1.add_argument('-r', '--routers',  type=int,   default=10,   help='Number of routers. Default=10.')
+	parser1.add_argument('-c', '--commands', type=int,   default=10,   help='Number of commands with template, per router. Default=10.')
+	parser1.add_argument('-n', '--rows',     type=int,   default=50,   help='Rows of the output of each command. Default=50.')
+	parser1.add_argument('-x', '--changes',  type=float, default=0.05, help='Fraction of rows changed in post. Default=0.05.')
+	parser1.add_argument('-g', '--general',  type=int,   default=1,    help='Number of commands without template, per router. Default=1.')
+	parser1.add_argument('-s', '--seed',     type=int,   default=1,    help='Seed of the random changes. Default=1.')
+	args = parser1.parse_args()
+
+	dFolders = makeLogs(args.output, args.routers, args.commands, args.rows, args.changes, args.general, args.seed)
+
+	print(f"{args.routers} routers written in {dFolders['pre']} and {dFolders['post']}")
+	print(f"{args.commands} templates written in {dFolders['Templates']} and {dFolders['TemplatesTTP']}")
+
+if __name__ == '__main__':
+	main()
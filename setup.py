@@ -2,7 +2,7 @@ from setuptools import setup
 
 setup(
     name='logChecker',
-    version='4.5.6',
+    version='4.6.0',
     description='A simple log analysis tool',
     long_description='A parsing tool to easily perform pre and post check comparisons after a maintenance window.',
     long_description_content_type='text/x-rst',
@@ -16,6 +16,9 @@ setup(
                       'XlsxWriter>=3.0.3,<=3.2.0',
                       'ttp>=0.9.0,<=0.9.5',
                       ],
+    extras_require={
+        'columnar': ['pyarrow'],
+    },
     python_requires='>=3.8',
     classifiers=[
     "Programming Language :: Python :: 3",
@@ -1,2 +1,2 @@
-__version__ = "4.5.6"
+__version__ = "4.6.0"
 __author__ = 'Lucas Aimaretto, Beatriz Bonafe'
\ No newline at end of file
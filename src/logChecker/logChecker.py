@@ -13,22 +13,54 @@
 # but WITHOUT ANY WARRANTY of any kind whatsoever.
 # 
 
-import textfsm
-import pandas as pd
 import glob
 import argparse
+import sys
 from sys import platform as _platform
 import json
 import re
-from ttp import ttp
 import os
 import io
 import time
+import datetime
+import contextlib
+import socket
+import socketserver
+import hashlib
+import gc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+import cProfile
+import importlib.util
+
+try:
+	import resource
+except ImportError: # Windows
+	resource = None
+
+def lazyImport(name):
+	"""
+	Returns the module name, which is only loaded when one of its attributes is used for the first time
+	(importlib.util.LazyLoader). Used for pandas, so that -v, -h and the client of the daemon (-dm)
+	don't pay for its import. textfsm, ttp and docx are imported inside the functions that use them.
+	"""
+
+	if name in sys.modules:
+		return sys.modules[name]
+
+	spec        = importlib.util.find_spec(name)
+	loader      = importlib.util.LazyLoader(spec.loader)
+	spec.loader = loader
+	module      = importlib.util.module_from_spec(spec)
 
-import docx
-from docx.enum.style import WD_STYLE_TYPE
-from docx.enum.text import WD_LINE_SPACING
-from docx.shared import Pt
+	sys.modules[name] = module
+	loader.exec_module(module)
+
+	return module
+
+pd = lazyImport('pandas')
+np = lazyImport('numpy')
 
 
 DATA_VALUE         = 'Value'
@@ -40,6 +72,7 @@ DATA_FLTR_ACTN     = '#filterAction:'
 PRE                = 'Pre'
 POST               = 'Post'
 IDX_PRE_POST       = 'Idx Pre/Post'
+CHANGE             = 'Change' # Kind of change of the lines of the general template: changed, deleted or inserted (see diffGeneral)
 
 INDEX_COL = {
 	'sheet' : {
@@ -53,6 +86,10 @@ INDEX_COL = {
 	}
 }
 
+INDEX_COL_ROWS = {
+	'position': 3, 'col': 'D:D', 'colName': 'Rows', 'width': 15,
+}
+
 RTR_ID = dict(
 	name = ['NAME'],
 	both = ['NAME','IP'],
@@ -60,7 +97,9 @@ RTR_ID = dict(
 )
 
 CELL_COLOR = 'black'
+HEADER_FORMAT = {'bold': True, 'top': 1, 'right': 1, 'bottom': 1, 'left': 1, 'align': 'center', 'valign': 'top'} #Same as the header of DataFrame.to_excel
 CELL_FONT_SIZE = '12'
+ATP_DISCARD = re.compile('[^\x20-\x7e\n]') #Characters removed from the outputs in the ATP: all but printable ASCII and new line
 NO_MATCH = '\n(([N|n]o [M|m]atching [E|e]ntr(y|(ies))( [F|f]ound)?(\.)?\n)|(No.+?: 0\n)|(Number of.+: 0\n))(-+|=+)?$'
 
 D_STATUS = dict(
@@ -105,12 +144,6 @@ D_STATUS = dict(
 		warnText = '####### CHANGES DETECTED #######',
 		errText  = '####### MAJOR ERRORS DETECTED POST-TASK #######',
 		shortText = 'Major Errors',
-	),
-	ambiguity = dict(
-		colorTab = '#40FFE8', #teal
-		warnText = "####### CAN'T COMPARE. PLEASE USE THE SPECIFIC TEMPLATE #######",
-		errText  = None,
-		shortText = "Can't compare: use specific template",
 	)
 )
 
@@ -123,6 +156,14 @@ Value Required Lines (.+)
 Start
   ^${Lines} -> Record"""
 
+CACHE_EXT = '.pkl'
+
+STATE_VERSION = 2 # Version of the content of the state files (see stateKey); states of other versions are discarded
+
+DIFF_MAX_EDITS = 1000 # Maximum number of lines deleted and inserted looked for by diffLines, per router and command
+
+CATEGORY_RATIO = 0.5 # String columns with less distinct values than this fraction of the rows are stored as categoricals (see compactTable)
+
 NON_COMMAND_KEYS = ['name','ip','version','hwType','#FINSCRIPT','exit all','','/environment no more']
 
 def readTemplate(fileTemplate, templateFolder, templateEngine):
@@ -165,11 +206,14 @@ def readTemplate(fileTemplate, templateFolder, templateEngine):
 			'majorDown':['down','dwn'], #En función findMajor, case=False. Aquí no es necesario tener 'Down' y 'Dwn'
 			'filterColumns':[],
 			'filterAction':None,
-			'valueKeys':[]
+			'valueKeys':[],
+			'templateText':'',
+			'parser':None,
 		}
 
 		if tmpltName == GENERAL_TEMPL:
 			tmpltLines = GENERAL_TEMPL_LINES.splitlines()
+			d[tmpltName]['templateText'] = GENERAL_TEMPL_LINES
 
 		else:
 			fName = templateFolder+tmpltName
@@ -179,6 +223,7 @@ def readTemplate(fileTemplate, templateFolder, templateEngine):
 			except:
 				print(f'The template file {tmpltName} does not exist inside the folder {templateFolder}.\nPlease check.\nQuitting...')
 				quit()
+			d[tmpltName]['templateText'] = ''.join(tmpltLines)
 
 		for line in tmpltLines:
 
@@ -302,12 +347,79 @@ def readTemplate(fileTemplate, templateFolder, templateEngine):
 			# template columns
 			d[tmpltName]['filterColumns'] = d[tmpltName]['templateColumns'].copy()
 
+		# The template is compiled only once, here. The resulting parser is reused by makeParsed()
+		# for every router and command.
+		d[tmpltName]['parser'] = compileTemplate(tmpltName, d[tmpltName]['templateText'], templateEngine)
+
 	print(f'##### Successfully Loaded Templates from folder {templateFolder} #####')
 	return d
 
-def makeParsed(nomTemplate, routerLog, templateFolder, templateEngine, templateColumns):
+def compileTemplate(tmpltName, templateText, templateEngine):
+	"""
+	Compiles a template, so it can be reused for every router and command.
+
+	Args:
+		tmpltName (string):    name of the template
+		templateText (string): content of the template
+		templateEngine (string): type of templates
+
+	Returns:
+		textfsm.TextFSM or ttp object. None if the template can't be compiled with the selected engine.
+	"""
+
+	if templateEngine == 'textFSM':
+
+		import textfsm
+
+		try:
+			return textfsm.TextFSM(io.StringIO(templateText)) #Para leer correctamente en textfsm.TextFSM(template)
+		except textfsm.TextFSMTemplateError as e:
+			print(f'The template {tmpltName} can not be compiled by textFSM: {e}\nPlease check.\nQuitting...')
+			quit()
+
+	if templateEngine == 'ttp' and tmpltName != GENERAL_TEMPL:
+
+		from ttp import ttp
+
+		return ttp(template=templateText)
+
+	return None
+
+def ttpTable(results):
+	"""
+	Table of the results of a ttp template, as parser.result(format='table') returns it: first row with the
+	headers, sorted, and one row per result. The outputter of ttp keeps its state in a dictionary shared by all
+	the ttp objects, so it can't be used with several compiled parsers (see compileTemplate): the table is built here.
+
+	Args:
+		results (list): results of the template, one per input
+
+	Returns:
+		list of rows
+	"""
+
+	items = []
+
+	for datum in results:
+		if not datum:
+			continue
+		elif isinstance(datum, list):
+			items += datum
+		elif isinstance(datum, dict):
+			items.append(datum)
+
+	headers = sorted(set().union(*[item.keys() for item in items]))
+	table   = [headers]
+
+	for item in items:
+		table.append([item.get(h, '') for h in headers])
+
+	return table
+
+def makeParsed(nomTemplate, routerLog, templateFolder, templateEngine, templateColumns, parser=None):
 	"""
-	Parse through textFSM (reading the file again)
+	Parse through textFSM or ttp. If a compiled parser is provided (see compileTemplate), it is reused;
+	otherwise the template file is read again.
 
 	Args:
 		nomTemplate (string): name of file containing the textFSM template
@@ -315,6 +427,7 @@ def makeParsed(nomTemplate, routerLog, templateFolder, templateEngine, templateC
 		templateFolder (string): folder containing the templates
 		templateEngine (string): type of templates
 		templateColumns (list): columns in the template
+		parser (object): compiled template, from readTemplate
 
 	Returns:
 		dataframe with parsed results
@@ -322,12 +435,19 @@ def makeParsed(nomTemplate, routerLog, templateFolder, templateEngine, templateC
 
 	if templateEngine == 'textFSM':
 
-		if nomTemplate == GENERAL_TEMPL:
-			template = io.StringIO(GENERAL_TEMPL_LINES) #Para leer correctamente en textfsm.TextFSM(template)
+		if parser is not None:
+			# Reset() brings the state machine back to its Start state, with no records,
+			# so the results are the same as with a freshly built TextFSM object.
+			results_template = parser
+			results_template.Reset()
+		elif nomTemplate == GENERAL_TEMPL:
+			import textfsm
+			results_template = textfsm.TextFSM(io.StringIO(GENERAL_TEMPL_LINES))
 		else:
-			template = open(templateFolder + nomTemplate)
+			import textfsm
+			with open(templateFolder + nomTemplate) as template:
+				results_template = textfsm.TextFSM(template)
 
-		results_template = textfsm.TextFSM(template)
 		parsed_results   = results_template.ParseText(routerLog)
 
 		# With list of results, we build a Pandas DataFrame
@@ -335,28 +455,39 @@ def makeParsed(nomTemplate, routerLog, templateFolder, templateEngine, templateC
 
 	if templateEngine == 'ttp':
 
-		with open(templateFolder + nomTemplate) as f:
-			template = f.read()
+		if parser is not None:
+			parser.clear_input()
+			parser.clear_result()
+			parser.add_input(routerLog)
+		else:
+			from ttp import ttp
+
+			with open(templateFolder + nomTemplate) as f:
+				template = f.read()
+
+			parser = ttp(data=routerLog, template=template)
 
-		parser = ttp(data=routerLog, template=template)
 		parser.parse()
 
-		output = parser.result(format='table')
-		parsed_results = output[0][1][0]
+		output = ttpTable(parser.result()[0])
+		parsed_results = output[1][0]
 
 		parsed_results = pd.DataFrame(parsed_results, columns= templateColumns)
 
 	return parsed_results
 
-def readLog(logFolder, formatJson):
+def readLog(logFolder, formatJson, dState=None):
 	"""
-	Reads logs, and stores router logs in memory for processing
+	Lists the logs of the folder. The logs are not loaded here: they are read one by one,
+	while iterating the returned generator, so only one log is kept in memory at a time.
 
 	Args:
 		logFolder (string):  name of folder
 		formatJson (string): "yes" or "no"
+		dState (dict):       state of the previous run (see readState). If set, the logs which didn't change
+		                     since then are not loaded, and the routers whose log was removed are dropped from it.
 
-	Returns: dictionary with logs
+	Returns: generator of (fileName, log), one per router. log is None if it didn't change since the previous run.
 	"""
 
 	if formatJson is True:
@@ -380,523 +511,1606 @@ def readLog(logFolder, formatJson):
 		print(str(_platform) + ": not a valid platform. Quitting....")
 		quit()
 
-	d = {}
+	if dState is not None:
+		for name in [x for x in dState['routers'].keys() if x not in listContent]:
+			del dState['routers'][name]
+		dState['reparsed'] = 0
 
-	if formatJson is True:
+	return iterLog(listContent, logFolder, formatJson, dState)
+
+def iterLog(listContent, logFolder, formatJson, dState=None):
+	"""
+	Reads the logs of listContent, one at a time.
+	With dState, a log is only loaded if its modification time or size changed since the previous run,
+	and its content (sha256) too. The logs which didn't change are yielded as None.
+
+	Args:
+		listContent (list):  names of the log files
+		logFolder (string):  name of folder
+		formatJson (string): "yes" or "no"
+		dState (dict):       state of the previous run, see readState
+
+	Yields: (fileName, log)
+	"""
+
+	for name in listContent:
+		if dState is not None:
+			st    = os.stat(name)
+			dFile = dState['routers'].get(name)
+
+			if dFile is not None and dFile['dRouter'] is not None and (dFile['mtime'], dFile['size']) == (st.st_mtime_ns, st.st_size):
+				yield name, None
+				continue
 
-		for name in listContent:
 			with open(name) as f:
-				d[name] = json.load(f)
+				text = f.read()
 
-	else:
-	
-		for name in listContent:
+			digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+			if dFile is not None and dFile['dRouter'] is not None and dFile['hash'] == digest:
+				# Same content, touched file
+				dFile['mtime'] = st.st_mtime_ns
+				dFile['size']  = st.st_size
+				yield name, None
+				continue
+
+			dState['routers'][name] = dict(mtime = st.st_mtime_ns, size = st.st_size, hash = digest, dRouter = None)
+			dState['reparsed']      = dState['reparsed'] + 1
+
+			log = json.loads(text) if formatJson is True else text
+
+		else:
 			with open(name) as f:
-				d[name] = f.read()
+				if formatJson is True:
+					log = json.load(f)
+				else:
+					log = f.read()
 
-	print(f'##### Logs Loaded Successfully from folder {logFolder} #####')
+		yield name, log
 
-	return d
+	print(f'##### Logs Loaded Successfully from folder {logFolder} #####')
 
-def parseResults(dTmpl, dLog, templateFolder, templateEngine, routerId):
+def makeCommandIndex(dTmpl):
 	"""
-	Build the Dataframe from textFSM filter, index and router log
+	Builds the index used to dispatch commands to templates. The regex of every template (#Command:)
+	is compiled only once.
 
 	Args:
-		dTmpl (dict):           dictionary with info from templates.
-		dLog (dict):            dicitonary with logs. Each key is the fileName; the value, is the content of the log.
-		templateFolder (str):   folder of templates
-		templateEngine:         textFsm or ttp
-		routerId:               name, IP or both
+		dTmpl (dict): dictionary with info from templates.
 
 	Returns:
-		datosEquipo (dict): Dictionary where keys are templateNames. For each key, a DF with parsed results.
+		dCmdIdx (dict): 'regex' is a list of (tmpltName, compiled regex), following the order of dTmpl;
+		'cache' stores the templates already matched for each command.
 	"""
-	
-	def detParseStatus(datosCmdsLogs,dfTemp):
-		"""
-		To determine the parseStatus. Options: no_matching_entries, no_parsing, no_data, ok.
-		Here, we don't consider the comparision between pre and post logs (statuses: changes_detected and major_errors)
-		"""
-
-		parseStatus = 'no_template'
-		if len(datosCmdsLogs) > 0 and len(dfTemp) == 0:
-			if re.search(NO_MATCH, datosCmdsLogs):
-				parseStatus = 'no_matching_entries'
-			else:
-				parseStatus = 'no_parsing'
-		elif len(dfTemp) == 0 and len(datosCmdsLogs) == 0:
-			parseStatus = 'no_data'
-		else:
-			parseStatus = 'ok'
-		
-		return parseStatus
-	
-	def writeDfTemp(dfResult, filterCols, orderedColums, routerId, routerName, routerIP, dfTemp):
 
-		# If there are columns to be filtered, we reduced the 
-		# size of the DF to that number of columns
-		if len(filterCols) > 0:
-			dfResult = dfResult[filterCols].copy()
+	dCmdIdx = dict(
+		regex = [(tmpltName, re.compile(dTmpl[tmpltName]['commandKey'])) for tmpltName in dTmpl.keys() if tmpltName != GENERAL_TEMPL],
+		cache = {},
+	)
 
-		# We need to define the identification of the router.
-		if 'NAME' in RTR_ID[routerId]:
-			dfResult['NAME'] = routerName
+	return dCmdIdx
 
-		if 'IP' in RTR_ID[routerId]:
-			dfResult['IP']   = str(routerIP)
+def matchTemplates(dCmdIdx, command):
+	"""
+	Returns the list of templates whose command matches the command of the log.
+	GENERAL_TEMPL is never part of the list: when the list is empty, the command
+	is processed with the general template.
 
-		dfResult = dfResult[orderedColums]
-		dfTemp = pd.concat([dfTemp, dfResult])
+	Args:
+		dCmdIdx (dict): index built with makeCommandIndex
+		command (string): command obtained from the log
 
-		# It is stored in the dataEquipment dictionary with the key nomTemplate
-		# the DF with the data of all routers
-		return dfTemp
+	Returns:
+		list with the names of the matched templates
+	"""
 
-	def mixAll(dTmpl, datosEquipo, routerId, cmdsLogs, datosCmdsLogs, tmpltName):
-		"""
-		Function that generates the final DF and obtains parsing status.
-		It also updates the datosEquipo dict.
-		The counter 'i' is only used when tmpltName is GENERAL_TEMPL
-		"""
+	if command not in dCmdIdx['cache']:
+		dCmdIdx['cache'][command] = [tmpltName for tmpltName, prog in dCmdIdx['regex'] if prog.search(command)]
 
-		if re.match(r"general_\d+", tmpltName):
-			templateColumns	= dTmpl[GENERAL_TEMPL]['templateColumns']
-			filterCols		= dTmpl[GENERAL_TEMPL]['filterColumns']
-			orderedColums	= RTR_ID[routerId] + filterCols
-		else:
-			templateColumns	= dTmpl[tmpltName]['templateColumns']
-			filterCols		= dTmpl[tmpltName]['filterColumns']
-			orderedColums	= RTR_ID[routerId] + filterCols
+	return dCmdIdx['cache'][command]
 
-		if tmpltName not in datosEquipo:
-			datosEquipo[tmpltName] = {}
+def cacheKey(templateText, templateEngine, routerLog):
+	"""
+	Key of an entry of the parse cache: hash of the template, the engine and the log of the command.
+	"""
 
-		datosEquipo[tmpltName]['command'] = cmdsLogs
+	h = hashlib.sha256()
+	for x in [templateEngine, templateText, routerLog]:
+		h.update(x.encode('utf-8', 'surrogatepass'))
+		h.update(b'\0')
 
-		if re.match(r"general_\d+", tmpltName):
-			datosEquipo[tmpltName]['template'] = GENERAL_TEMPL
-			datosEquipo[tmpltName]['valueKeys'] = ["Lines"]
-		else:
-			datosEquipo[tmpltName]['template'] = tmpltName
-			datosEquipo[tmpltName]['valueKeys'] = dTmpl[tmpltName]['valueKeys']
+	return h.hexdigest()
 
-		if 'dfResultDatos' not in datosEquipo[tmpltName]:
-			datosEquipo[tmpltName]['dfResultDatos'] = pd.DataFrame()
+def readCache(cacheDir, key):
+	"""
+	Returns the DF stored in the parse cache under key, or None if there is no such entry.
+	The modification time of the entry is updated, so evictCache removes the least recently used entries first.
+	"""
 
-		routerLog = cmdsLogs + '\n' + datosCmdsLogs + '\n' #Command and your data
+	fName = os.path.join(cacheDir, key + CACHE_EXT)
 
-		# We parse results from the key:value association
-		# A list is returnd with results
-		# to parse, with provide the complete set of columns as defined inside the template: templateColumns
-		
-		if re.match(r"general_\d+", tmpltName):
-			dfResult = makeParsed(GENERAL_TEMPL, routerLog, templateFolder, templateEngine, templateColumns)
-		else:
-			dfResult = makeParsed(tmpltName, routerLog, templateFolder, templateEngine, templateColumns)
+	try:
+		dfResult = pd.read_pickle(fName)
+		os.utime(fName)
+	except Exception:
+		return None
 
-		datosEquipo[tmpltName]['dfResultDatos']	= writeDfTemp(dfResult, filterCols, orderedColums, routerId, routerName, routerIP, datosEquipo[tmpltName]['dfResultDatos'])
-		datosEquipo[tmpltName]['parseStatus']	= detParseStatus(datosCmdsLogs, datosEquipo[tmpltName]['dfResultDatos'])
+	return dfResult
 
-		return datosEquipo		
+def writeCache(cacheDir, key, dfResult):
+	"""
+	Stores the DF in the parse cache. The file is renamed once written, so other processes
+	never read a partial entry.
+	"""
 
-	datosEquipo		    = {}
-	dNoMatchedLog	    = {} #Dictionary similar to dLog, but only with noMatched information
-	noMatchedCmdAllRtr	= []
+	fName = os.path.join(cacheDir, key + CACHE_EXT)
+	fTemp = fName + '.' + str(os.getpid())
 
-	for idR, routerLogKey in enumerate(dLog.keys()): #To each router
-		routerLogFname  = routerLogKey.split("/")[-1]
+	try:
+		dfResult.to_pickle(fTemp)
+		os.replace(fTemp, fName)
+	except OSError as e:
+		print(f'The parse cache entry {fName} could not be written: {e}')
 
-		routerName		= dLog[routerLogKey]['name']
-		routerIP		= dLog[routerLogKey]['ip']
+def evictCache(cacheDir, cacheSize):
+	"""
+	Removes the least recently used entries of the parse cache, until its size is below cacheSize (MB).
+	"""
 
-		#The previous versions of taskAutom don't have this information
+	entries = []
+	for f in glob.glob(os.path.join(cacheDir, '*' + CACHE_EXT)):
 		try:
-			routerVersion	= dLog[routerLogKey]['version']
-		except:
-			routerVersion	= 'NA'
+			st = os.stat(f)
+		except OSError:
+			continue
+		entries.append((st.st_mtime, st.st_size, f))
+
+	totalSize = sum([x[1] for x in entries])
+	maxSize   = cacheSize * 1024 * 1024
+
+	for mtime, size, f in sorted(entries):
+		if totalSize <= maxSize:
+			break
 		try:
-			routerHwType	= dLog[routerLogKey]['hwType']
-		except:
-			routerHwType	= 'NA'
+			os.remove(f)
+			totalSize = totalSize - size
+		except OSError:
+			pass
 
-		#For use just keys with command:
-		command_keys = [k for k in dLog[routerLogKey].keys() if k not in NON_COMMAND_KEYS]
-		# logs is each command that was executed in router, inside json file.
-		
-		noMatchedCmdPerRtr = command_keys.copy()
-		# To control which command have no matching template (here, per router)
-
-		#For each command in command_keys(list)
-		for cmdsLogs in command_keys: 
-			datosCmdsLogs = dLog[routerLogKey][cmdsLogs] #Logs obtained for each command
-			matched_templates = []
-
-			#For each template, we test the match with command, 
-			for idT, tmpltName in enumerate(dTmpl.keys()):
-				commandKey		= dTmpl[tmpltName]['commandKey']
-
-				# command name in each template file
-				prog = re.compile(commandKey)
-
-				# searchKey is the regex match between logs and prog
-				match = prog.search(cmdsLogs)
-
-				if match and (tmpltName != GENERAL_TEMPL):
-					# If there's a match, we take that command off the list noMatchedCmdPerRtr
-					# Important for processing cases that use generic template
-					matched_templates.append(tmpltName)
-					if cmdsLogs in noMatchedCmdPerRtr:
-						noMatchedCmdPerRtr.remove(cmdsLogs)
-						
-			for tmpltName in matched_templates:
-					
-				datosEquipo = mixAll(dTmpl, datosEquipo, routerId, cmdsLogs, datosCmdsLogs, tmpltName)
+def stateKey(dTmpl, *args):
+	"""
+	Key of the state of an incremental run: hash of STATE_VERSION, of the templates and of the other parameters
+	(args) which change the results. The state of a previous run is only used if the key is the same.
+	"""
 
-		# Writing dNoMatchedLog for each router. At this point, all attempts to match templates already occurred.
-		for cmdsLogs in noMatchedCmdPerRtr:
+	h = hashlib.sha256()
+	for x in [str(x) for x in (STATE_VERSION,) + args] + [x + '\0' + dTmpl[x]['templateText'] for x in sorted(dTmpl.keys())]:
+		h.update(x.encode('utf-8', 'surrogatepass'))
+		h.update(b'\0')
 
-			if cmdsLogs not in noMatchedCmdAllRtr:
-				noMatchedCmdAllRtr.append(cmdsLogs) 
-				# Adding to list to no-matched commands, containing information of all routers
-			
-			#Adding the information to dNoMatchedLog: the dict that only has the cases of no-matched command
-			if routerLogKey not in dNoMatchedLog:
-				dNoMatchedLog[routerLogKey] = {}
+	return h.hexdigest()
 
-			#This information is required in the following "for"
-			dNoMatchedLog[routerLogKey][cmdsLogs] = dLog[routerLogKey][cmdsLogs] 
-			dNoMatchedLog[routerLogKey]['ip']	  = dLog[routerLogKey]['ip']    # for writeDfTemp
-			dNoMatchedLog[routerLogKey]['name']	  = dLog[routerLogKey]['name']	# for writeDfTemp
+def readState(fileName, key):
+	"""
+	Returns the state stored in fileName by a previous run, if its key is key. Otherwise, an empty state.
+	"""
 
-	#Processing the no-matched commands
+	try:
+		dState = pd.read_pickle(fileName)
+	except Exception:
+		dState = None
 
-	for idR, routerLogKey in enumerate(dNoMatchedLog.keys()):
-		# Basic information of the router, for writeDfTemp
-		routerName	= dLog[routerLogKey]['name']
-		routerIP	= dLog[routerLogKey]['ip']
+	if not isinstance(dState, dict) or dState.get('key') != key:
+		dState = dict(key = key)
 
-		for i,cmdsLogs in enumerate(noMatchedCmdAllRtr):
-			# Here, enumerate and noMatchedCmdAllRtr are used to ensure that all no-matched commands,
-			# indenpendently of the router, will have the same identification (i).
-			# So we can keep the information of the same command together correctly
+	return dState
 
-			# If certain router have datosCmdsLogs, we use this information in this iteration.
-			# Otherwise, moves to the other iteration of "for" of commands.
-			try:
-				datosCmdsLogs = dNoMatchedLog[routerLogKey][cmdsLogs] #Logs obtained for each command
-			except:
-				continue
+def writeState(fileName, dState):
+	"""
+	Stores the state of the run in fileName. The file is renamed once written, as in writeCache.
+	"""
 
-			datosEquipo = mixAll(dTmpl, datosEquipo, routerId, cmdsLogs, datosCmdsLogs, f'general_{i}')
+	fTemp = fileName + '.' + str(os.getpid())
 
-	return datosEquipo
+	try:
+		pd.to_pickle(dState, fTemp)
+		os.replace(fTemp, fileName)
+	except OSError as e:
+		print(f'The state {fileName} could not be written: {e}')
 
-def searchDiffAll(datosEquipoPre, datosEquipoPost, dTmplt, routerId, idxComp):
-	'''
-	Makes a new table, in which it brings the differences between two tables (post-pre)
-	'''
+def tableHash(df):
+	"""
+	Hash of the columns and rows of df, used to know if a table changed since the previous run.
+	"""
 
-	countDif = {}
+	h = hashlib.sha256(repr(list(df.columns)).encode('utf-8'))
+	h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
 
-	def obtain_idx_pre_post(dfCompl,df_pre_post, where):
-		'''
-		To create new column in dfCompl. Detects the matching index from dfPre or dfPost, for each row.
-		'''
+	return h.hexdigest()
 
-		df_pre_post.insert(len(df_pre_post.columns), IDX_PRE_POST, df_pre_post.index) #To get the index in column 'index'
-		dfCompl_m = dfCompl[dfCompl['Where'] == where].drop(columns=['Where']) #This column is not in df_pre_post
-		df_merged = pd.merge(dfCompl_m,df_pre_post,how='left',on=dfCompl_m.columns.tolist())
-		
-		if where == 'left_only':
-			df_merged.insert(len(df_merged.columns)-1,'Where',PRE)
+def detLogStatus(datosCmdsLogs):
+	"""
+	To determine the parseStatus of a command, when nothing was parsed from its log. Options: no_matching_entries, no_parsing, no_data.
+	If the accumulated DF of the template has rows, the parseStatus is ok (see mergeParsed).
+	Here, we don't consider the comparision between pre and post logs (statuses: changes_detected and major_errors)
+	"""
+
+	if len(datosCmdsLogs) > 0:
+		if re.search(NO_MATCH, datosCmdsLogs):
+			logStatus = 'no_matching_entries'
 		else:
-			df_merged.insert(len(df_merged.columns)-1,'Where',POST)
+			logStatus = 'no_parsing'
+	else:
+		logStatus = 'no_data'
 
-		return df_merged
+	return logStatus
 
-	for tmpltName in datosEquipoPre.keys():
-		if tmpltName not in countDif:
-			countDif[tmpltName] = {}
+def parseCommand(dTmpl, tmpltName, cmdsLogs, datosCmdsLogs, templateFolder, templateEngine, routerId, routerName, routerIP, cacheDir=''):
+	"""
+	Parses the log of one command of one router, with the template tmpltName.
+	If cacheDir is set, the results of makeParsed are looked for in (and stored to) the parse cache.
 
-		# In datosEquipoPre[tmpltName], tmpltName can be generic_0 and that key does not exist in the templates dictionary (dTmplt).
-		# That is why it is necessary to store the template in datosEquipoPre[tmpltName]['template'], so that it can then be related
-		# to dTmplt[template] (in the examples of the generic template, template == 'generic.template').
+	Returns:
+		dfResult (DataFrame): parsed results, with the router identification and the columns ordered as in RTR_ID[routerId] + filterColumns
+	"""
 
-		template	= datosEquipoPre[tmpltName]['template']
-		filterCols	= dTmplt[template]['filterColumns']
-		dfPre       = datosEquipoPre[tmpltName]['dfResultDatos'].reset_index(drop=True)
-		dfPost      = datosEquipoPost[tmpltName]['dfResultDatos'].reset_index(drop=True)
+	templateColumns	= dTmpl[tmpltName]['templateColumns']
+	filterCols		= dTmpl[tmpltName]['filterColumns']
+	orderedColums	= RTR_ID[routerId] + filterCols
 
-		if template != GENERAL_TEMPL:
+	routerLog = cmdsLogs + '\n' + datosCmdsLogs + '\n' #Command and your data
 
-			dfUnion = pd.merge(dfPre, dfPost, how='outer', indicator='Where').drop_duplicates()
-			dfInter = dfUnion[dfUnion.Where=='both']
-			dfCompl = dfUnion[~(dfUnion.isin(dfInter))].dropna(axis=0, how='all').drop_duplicates()
+	if dProfile['enabled']:
+		t0 = (time.perf_counter(), time.process_time())
 
-			if len(dfCompl) > 0 and idxComp == True: #Add index from pre-post table
+	# We parse results from the key:value association
+	# A list is returnd with results
+	# to parse, with provide the complete set of columns as defined inside the template: templateColumns
+	if cacheDir != '':
+		key      = cacheKey(dTmpl[tmpltName]['templateText'], templateEngine, routerLog)
+		dfResult = readCache(cacheDir, key)
+		if dfResult is None:
+			dfResult = makeParsed(tmpltName, routerLog, templateFolder, templateEngine, templateColumns, dTmpl[tmpltName]['parser'])
+			writeCache(cacheDir, key, dfResult)
+	else:
+		dfResult = makeParsed(tmpltName, routerLog, templateFolder, templateEngine, templateColumns, dTmpl[tmpltName]['parser'])
 
-				dfComplPre = obtain_idx_pre_post(dfCompl,dfPre,'left_only')
-				dfComplPost = obtain_idx_pre_post(dfCompl,dfPost,'right_only')
-				dfCompl = pd.concat([dfComplPre,dfComplPost],ignore_index=True)
-			else:
-				dfCompl['Where'] = dfCompl['Where'].str.replace('left_only',PRE)
-				dfCompl['Where'] = dfCompl['Where'].str.replace('right_only',POST)
+	# If there are columns to be filtered, we reduced the 
+	# size of the DF to that number of columns
+	if len(filterCols) > 0:
+		dfResult = dfResult[filterCols].copy()
 
-		elif template == GENERAL_TEMPL and dfPre.shape == dfPost.shape:
+	# We need to define the identification of the router.
+	if 'NAME' in RTR_ID[routerId]:
+		dfResult['NAME'] = routerName
 
-			rtrId   = RTR_ID[routerId][0] # This is so, because the key to identify the router can either be its name or IP; check what to do when routerId == 'both'
+	if 'IP' in RTR_ID[routerId]:
+		dfResult['IP']   = str(routerIP)
 
-			dfCompl = pd.DataFrame(columns=dfPre.columns) # We build an empty DF. Works better when routerId == 'both'
+	dfResult = dfResult[orderedColums]
 
-			for rtrName in dfPre[rtrId].unique():
-				
-				tempPre   = dfPre[dfPre[rtrId] == rtrName]
-				tempPost  = dfPost[dfPost[rtrId] == rtrName]
-				tempComp = tempPre.compare(tempPost, result_names=(PRE,POST), align_axis=0, keep_equal=True).reset_index() #Reset index to remove multiindex
-				tempComp = tempComp.rename(columns={'level_1':'Where','level_0':IDX_PRE_POST})
-				tempComp[rtrId] = rtrName
-				dfCompl = pd.concat([dfCompl,tempComp])
-			
-			#Maintaining the standard with the results from specific template
-			dfCompl = dfCompl.reindex(columns=[col for col in dfCompl.columns if col != IDX_PRE_POST] + [IDX_PRE_POST])
-
-		# When using general template and the dfs from pre and post are != in size, the comparision doesn't work 
-		# very well with the options above.
+	if dProfile['enabled']:
+		profileCall(routerName, tmpltName, t0, dfResult)
 
-		else:
-			datosEquipoPost[tmpltName]['parseStatus'] = 'ambiguity'
-			dfCompl = pd.DataFrame(columns=dfPre.columns)
+	return dfResult
 
-		orderedColums = RTR_ID[routerId] + filterCols
+def parseRouter(routerLogKey, dRouterLog, dTmpl, dCmdIdx, templateFolder, templateEngine, routerId, cacheDir=''):
+	"""
+	Parses all the commands of the log of one router.
 
-		countDif[tmpltName]['dfResultDatos'] = dfCompl.sort_values(by = orderedColums)
-		countDif[tmpltName]['valueKeys'] = datosEquipoPre[tmpltName]['valueKeys']
+	Args:
+		routerLogKey (str):     fileName of the log
+		dRouterLog (dict):      content of the log
+		dTmpl (dict):           dictionary with info from templates.
+		dCmdIdx (dict):         index built with makeCommandIndex
+		templateFolder (str):   folder of templates
+		templateEngine:         textFsm or ttp
+		routerId:               name, IP or both
+		cacheDir (str):         folder of the parse cache. If empty, the cache is not used.
 
-	return countDif
+	Returns:
+		dict with:
+			matched (list):   (tmpltName, cmdsLogs, dfResult, logStatus), in the order in which commands and templates were matched.
+			noMatched (dict): for the commands without a matching template, cmdsLogs: (dfResult, logStatus), parsed with GENERAL_TEMPL.
+	"""
 
-def findMajor(count_dif, dTmplt, routerId, datosEquipoPre):
-	'''
-	Makes a table from the results of searching for Major errors in the post table define in yml file for specific template,\n
-	or down if is not define the words for the template, which are not in the Pre table
-	'''
+	routerName		= dRouterLog['name']
+	routerIP		= dRouterLog['ip']
 
-	countDown  = {}
-	
-	for tmpltName in count_dif.keys():
-		if tmpltName not in countDown:
-			countDown[tmpltName] = {}
+	#For use just keys with command:
+	command_keys = [k for k in dRouterLog.keys() if k not in NON_COMMAND_KEYS]
+	# logs is each command that was executed in router, inside json file.
 
-		df = pd.DataFrame()
-		template = datosEquipoPre[tmpltName]['template']
+	dRouter = dict(
+		matched   = [],
+		noMatched = {},
+	)
 
-		for majorWord in dTmplt[template]['majorDown']:
+	#For each command in command_keys(list)
+	for cmdsLogs in command_keys: 
+		datosCmdsLogs = dRouterLog[cmdsLogs] #Logs obtained for each command
 
-			filterCols = dTmplt[template]['filterColumns']
+		#Templates whose command matches cmdsLogs
+		if dProfile['enabled']:
+			t0 = (time.perf_counter(), time.process_time())
+			matched_templates = matchTemplates(dCmdIdx, cmdsLogs)
+			profileCall(routerName, PROFILE_DISPATCH, t0)
+		else:
+			matched_templates = matchTemplates(dCmdIdx, cmdsLogs)
 
-			if 'Where' in count_dif[tmpltName]['dfResultDatos'].columns:
+		if len(matched_templates) > 0:
+			logStatus = detLogStatus(datosCmdsLogs)
+			for tmpltName in matched_templates:
+				dfResult = parseCommand(dTmpl, tmpltName, cmdsLogs, datosCmdsLogs, templateFolder, templateEngine, routerId, routerName, routerIP, cacheDir)
+				dRouter['matched'].append((tmpltName, cmdsLogs, dfResult, logStatus))
 
-				df1 = count_dif[tmpltName]['dfResultDatos'][count_dif[tmpltName]['dfResultDatos']['Where']==POST]
-				
-				if len(df1) > 0:
-					df1 = df1[df1.apply(lambda r: r.str.contains(majorWord, case=False).any(), axis=1)]
-				else:
-					df1 = pd.DataFrame(columns=count_dif[tmpltName]['dfResultDatos'].columns)
+		else:
+			# No matching template: the command is processed with the general template
+			dfResult = parseCommand(dTmpl, GENERAL_TEMPL, cmdsLogs, datosCmdsLogs, templateFolder, templateEngine, routerId, routerName, routerIP, cacheDir)
+			dRouter['noMatched'][cmdsLogs] = (dfResult, detLogStatus(datosCmdsLogs))
 
-				df = pd.concat([df, df1])
+	return dRouter
 
-				df = df.sort_values(by = RTR_ID[routerId] + filterCols)
+# State of each worker process of parseResults, loaded once by initParseWorker
+dWorker = {}
 
-		df = df.reset_index(drop=True)
-		countDown[tmpltName]['dfResultDatos'] = df
+def initParseWorker(dTmpl, templateFolder, templateEngine, routerId, cacheDir, profile=False):
+	"""
+	Initializer of the worker processes of parseResults. Compiled parsers can't be sent to
+	other processes, so each worker compiles the templates once, here.
+	"""
 
-	return countDown
+	dProfile['enabled']			= profile
 
-def makeTable(datosEquipoPre, datosEquipoPost):
-	'''
-	Sort the table pre and post to present in Excel
-	'''
+	dWorker['dTmpl']			= compileParsers(dTmpl, templateEngine)
+	dWorker['dCmdIdx']			= makeCommandIndex(dTmpl)
+	dWorker['templateFolder']	= templateFolder
+	dWorker['templateEngine']	= templateEngine
+	dWorker['routerId']			= routerId
+	dWorker['cacheDir']			= cacheDir
 
-	df_all          = {}
-	datosEquipoPre1 = datosEquipoPre.copy()
-	
-	for tmpltName in datosEquipoPre.keys():
-		if tmpltName not in df_all:
-				df_all[tmpltName] = {}
+def parseRouterWorker(routerItem):
+	"""
+	Runs parseRouter inside a worker process. routerItem is (routerLogKey, dRouterLog).
+	"""
 
-		datosEquipoPre1[tmpltName]['##']='##'
+	routerLogKey, dRouterLog = routerItem
 
-		dfPre1 = datosEquipoPre1[tmpltName]['dfResultDatos'].reset_index(drop=True)
-		dfPost = datosEquipoPost[tmpltName]['dfResultDatos'].reset_index(drop=True)
-		df_all[tmpltName]['dfResultDatos']	= pd.concat([dfPre1, dfPost], axis=1, keys=('Pre-Check', 'Post-Check'))
+	dRouter = parseRouter(routerLogKey, dRouterLog, dWorker['dTmpl'], dWorker['dCmdIdx'], dWorker['templateFolder'], dWorker['templateEngine'], dWorker['routerId'], dWorker['cacheDir'])
 
-		df_all[tmpltName]['parseStatus']	= datosEquipoPost[tmpltName]['parseStatus']
-		df_all[tmpltName]['command']		= datosEquipoPre[tmpltName]['command']
+	if dProfile['enabled']:
+		# The parse calls profiled in the worker are sent back with the results of the router
+		dRouter['calls']  = dProfile['calls']
+		dProfile['calls'] = []
 
-	return df_all
+	return dRouter
 
-def constructExcel(df_final, count_dif, searchMajor, folderLog):
+def mergeParsed(datosEquipo, tmpltName, template, valueKeys, cmdsLogs, dfResult, logStatus):
 	"""
-	Sort the data and format creating the Excel
-	_summary_
-
-	Args:
-		df_final (pandas): DataFrame with pre and post data
-		count_dif (pandas): DataFrame with only differences
-		searchMajor (pandas): DataFrame with only errors
-		folderLog (string): name of the folder
+	Updates the datosEquipo dict with the results of one command of one router.
+	The parsed results are only collected in a list (lResultDatos); the final DF is
+	built once, by concatResults, when all routers have been processed.
 	"""
 
-	def diff_colors(valueKeys,dfDiff,start_row,worksheet,end_col):
+	if tmpltName not in datosEquipo:
+		datosEquipo[tmpltName] = {}
+		datosEquipo[tmpltName]['lResultDatos'] = []
+		datosEquipo[tmpltName]['nRows']        = 0
 
-		dfDiff["idx_temp"] = dfDiff[valueKeys].agg('-'.join, axis=1) #Creation column with keys
-		id_router = dfDiff[dfDiff.columns[0]].unique() #First column value (name or IP)
+	datosEquipo[tmpltName]['command']	= cmdsLogs
+	datosEquipo[tmpltName]['template']	= template
+	datosEquipo[tmpltName]['valueKeys']	= valueKeys
 
-		for id in id_router: #Selecting data by router
-			df_f_name = dfDiff[dfDiff[dfDiff.columns[0]] == id]
+	# It is stored in the dataEquipment dictionary with the key nomTemplate
+	# the DF with the data of all routers
+	datosEquipo[tmpltName]['lResultDatos'].append(dfResult)
+	datosEquipo[tmpltName]['nRows']			+= len(dfResult)
+	datosEquipo[tmpltName]['parseStatus']	= logStatus if datosEquipo[tmpltName]['nRows'] == 0 else 'ok'
 
-			templ_keys = df_f_name["idx_temp"].unique() 
+	return datosEquipo
 
-			for key in templ_keys: #Filtering pre-post pairs for each key
-				df_f_keys = df_f_name[df_f_name["idx_temp"] == key]
-				row_pair = df_f_keys.index.tolist() #Indices of the pre-post pair rows
+def concatResults(datosEquipo):
+	"""
+	Builds the final DF of each template, with a single concat of the results collected by mergeParsed.
+	"""
 
-				first_pair = dfDiff.iloc[row_pair[0]] #First line of pre-post pair
+	for tmpltName in datosEquipo.keys():
+		datosEquipo[tmpltName]['dfResultDatos'] = compactTable(pd.concat(datosEquipo[tmpltName].pop('lResultDatos')))
+		del datosEquipo[tmpltName]['nRows']
 
-				if len(row_pair) > 1: # If there's a pre AND post pair
-					second_pair = dfDiff.iloc[row_pair[1]]
-				else:
-					second_pair = None #Case where the row only appears in pre or post
-
-				if second_pair is not None:
-					for col in dfDiff.columns:
-						if (col not in ['Where', IDX_PRE_POST]) and first_pair[col] != second_pair[col]:
-							col_idx = dfDiff.columns.get_loc(col)
-
-							worksheet.conditional_format( #Coloring
-								start_row + row_pair[0], col_idx +1, start_row + row_pair[1], col_idx +1,
-								{'type': 'no_blanks', 'format': workbook.add_format({'bg_color': '#FFC7CE'}) }
-							)
-							worksheet.conditional_format( #Black line below, until the end of dfDiff
-								start_row + row_pair[1], 2, start_row + row_pair[1], end_col,
-								{'type': 'no_blanks', 'format': workbook.add_format({'bottom': 1}) }
-							)
-							worksheet.conditional_format( #Black line below, until the end of dfDiff for blanks cells
-								start_row + row_pair[1], 2, start_row + row_pair[1], end_col,
-								{'type': 'blanks', 'format': workbook.add_format({'bottom': 1}) }
-							)
-							worksheet.conditional_format( #Fixing the first column
-								start_row + row_pair[1], 1, start_row + row_pair[1], 1,
-								{'type': 'no_blanks', 'format': workbook.add_format({'bottom': 1,'left':1}) }
-							)
-
-				else: #Just one pre/post line
-					worksheet.conditional_format( #Fixing the first column
-						start_row + row_pair[0], 1, start_row + row_pair[0], 1,
-						{'type': 'no_blanks', 'format': workbook.add_format({'bottom': 1,'left':1}) }
-					)
-					worksheet.conditional_format( #Black line below, until the end of dfDiff
-						start_row + row_pair[0], 2, start_row + row_pair[0], end_col,
-						{'type': 'no_blanks', 'format': workbook.add_format({'bottom': 1,'top': 1}) }
-					)
-					worksheet.conditional_format( #Black line below, until the end of dfDiff for blanks cells
-						start_row + row_pair[0], 2, start_row + row_pair[0], end_col,
-						{'type': 'blanks', 'format': workbook.add_format({'bottom': 1,'top': 1}) }
-					)
+	return datosEquipo
 
-		return
+def compactTable(df):
+	"""
+	Stores the router id columns (NAME, IP), and the string columns with less distinct values than CATEGORY_RATIO
+	of the rows (admin/oper state, port type, ...), as pandas categoricals: each distinct string is kept once,
+	and each row only has its code. Columns with other values than strings (lists, numbers) are left as they are.
+	"""
 
-	fileName  = folderLog[:-1] + ".xlsx"
+	for col in df.columns:
 
-	writer    = pd.ExcelWriter(fileName, engine='xlsxwriter') #creates instance of an excel workbook
-	workbook  = writer.book
+		if df[col].dtype != object or pd.api.types.infer_dtype(df[col], skipna=True) != 'string':
+			continue
 
-	# Create index tab
-	indexSheet = workbook.add_worksheet('index')
+		if col in RTR_ID['both'] or df[col].nunique() < CATEGORY_RATIO * len(df):
+			df[col] = df[col].astype('category')
 
-	print('\nSaving Excel')
+	return df
 
-	for idx,template in enumerate(df_final.keys()):
+def copyTemplates(dTmpl):
+	"""
+	Returns a copy of dTmpl without the compiled parsers, which can't be sent to other processes.
+	The parsers are compiled again with compileParsers.
+	"""
 
-		dfData  = df_final[template]['dfResultDatos']
-		dfDiff  = count_dif[template]['dfResultDatos'].reset_index(drop=True)
-		dfMajor = searchMajor[template]['dfResultDatos']
-		dfParseStatus = df_final[template]['parseStatus']
+	return {tmpltName: {k:v for k,v in dTmpl[tmpltName].items() if k != 'parser'} for tmpltName in dTmpl.keys()}
 
-		sheet_name = template.replace('nokia_sros_','')
-		sheet_name = sheet_name.replace('.template','')
-		sheet_name = sheet_name.replace('_template','')
-		sheet_name = sheet_name.replace('.ttp','')
+def compileParsers(dTmpl, templateEngine):
+	"""
+	Compiles the templates of dTmpl which don't have a compiled parser yet.
+	"""
+
+	for tmpltName in dTmpl.keys():
+		if 'parser' not in dTmpl[tmpltName]:
+			dTmpl[tmpltName]['parser'] = compileTemplate(tmpltName, dTmpl[tmpltName]['templateText'], templateEngine)
+
+	return dTmpl
+
+def loadTemplates(dTemplates, csvTemplate, templateFolder, templateEngine):
+	"""
+	readTemplate, keeping the loaded templates (with their compiled parsers) in dTemplates, for the next runs
+	of a LogChecker object or of the daemon. The templates are read again if any file of templateFolder,
+	or the CSV, was added, removed or modified. With dTemplates None, the templates are always read.
+	"""
+
+	if dTemplates is None:
+		return readTemplate(csvTemplate, templateFolder, templateEngine)
+
+	files = sorted(glob.glob(templateFolder + '*')) + ([csvTemplate] if csvTemplate != '' else [])
+	lStat = []
+
+	for fileName in files:
+		try:
+			st = os.stat(fileName)
+			lStat.append((fileName, st.st_mtime_ns, st.st_size))
+		except OSError:
+			lStat.append((fileName, None, None))
+
+	key = (csvTemplate, templateFolder, templateEngine)
+
+	if key not in dTemplates or dTemplates[key]['files'] != lStat:
+		dTemplates[key] = dict(
+			files  = lStat,
+			dTmplt = readTemplate(csvTemplate, templateFolder, templateEngine),
+		)
+
+	return dTemplates[key]['dTmplt']
+
+def parseFolder(dTmpl, logFolder, formatJson, templateFolder, templateEngine, routerId, workers=1, cacheDir='', stateFile=''):
+	"""
+	Reads the logs of logFolder and parses them. Used to parse PRE and POST logs concurrently.
+	If stateFile is set, only the routers whose log changed since the previous run are parsed (see readLog),
+	and the results of each router are stored in stateFile for the next run.
+
+	Returns:
+		datosEquipo (dict): see parseResults
+	"""
+
+	dTmpl = compileParsers(dTmpl, templateEngine)
+
+	if stateFile != '':
+		dState = readState(stateFile, stateKey(dTmpl, templateEngine, routerId, formatJson, os.path.abspath(logFolder)))
+		dState.setdefault('routers', {})
+	else:
+		dState = None
+
+	dLog        = readLog(logFolder, formatJson, dState)
+	datosEquipo = parseResults(dTmpl, dLog, templateFolder, templateEngine, routerId, workers, cacheDir, dState)
+
+	if dState is not None:
+		print(f"##### Incremental run: {dState['reparsed']} of {len(dState['routers'])} routers parsed from folder {logFolder}, the rest taken from the previous run #####")
+		writeState(stateFile, dState)
+
+	return datosEquipo
+
+def parseFolderPre(dTmpl, *args):
+	"""
+	Runs parseFolder(dTmpl, *args) for PRE, in its own process, with captureOutput. dTmpl is None if the process
+	was forked: then the templates, with their compiled parsers, are those in dWorker['dTmplPre'], set by fncRun
+	before the fork, so the daemon and LogChecker don't compile them again for PRE in each run.
+
+	Returns:
+		(datosEquipo, messages printed by parseFolder)
+	"""
+
+	if dTmpl is None:
+		dTmpl = dWorker['dTmplPre']
+
+	return captureOutput(parseFolder, dTmpl, *args)
+
+def captureOutput(fn, *args):
+	"""
+	Runs fn(*args), keeping what it prints instead of writing it to stdout. Used for PRE and POST when they are
+	parsed at the same time, so that their messages are printed afterwards, whole and in order. If fn quits,
+	its messages are printed before quitting.
+
+	Returns:
+		(result of fn, messages printed by fn)
+	"""
+
+	log = io.StringIO()
+
+	try:
+		with contextlib.redirect_stdout(log):
+			result = fn(*args)
+	except SystemExit:
+		print(log.getvalue(), end='')
+		raise
+
+	return result, log.getvalue()
+
+def parseResults(dTmpl, dLog, templateFolder, templateEngine, routerId, workers=1, cacheDir='', dState=None):
+	"""
+	Build the Dataframe from textFSM filter, index and router log
+
+	Args:
+		dTmpl (dict):           dictionary with info from templates.
+		dLog (iterable):        logs, as (fileName, content of the log), one per router; see readLog. A dictionary with fileName as keys is also accepted.
+		templateFolder (str):   folder of templates
+		templateEngine:         textFsm or ttp
+		routerId:               name, IP or both
+		workers (int):          number of processes used to parse the routers. If 1, no extra process is used.
+		cacheDir (str):         folder of the parse cache. If empty, the cache is not used.
+		dState (dict):          state of the previous run, see readLog. The routers whose log is None are not parsed:
+		                        their results are taken from dState, where the results of the other routers are stored.
+
+	Returns:
+		datosEquipo (dict): Dictionary where keys are templateNames. For each key, a DF with parsed results.
+	"""
+
+	def collect(routerLogKey, dRouter):
+		"""
+		Adds the results of a router, parsed or taken from dState, in the order of dLog.
+		"""
+
+		if isinstance(dRouter, Future):
+			dRouter = dRouter.result()
+
+		if dState is not None:
+			dState['routers'][routerLogKey]['dRouter'] = dRouter
+
+		lRouters.append(dRouter)
+
+	if isinstance(dLog, dict):
+		dLog = dLog.items()
+
+	lRouters = []
+
+	if workers > 1:
+		# Compiled parsers are not sent to the workers; they compile the templates on their own.
+		dTmplWorker = copyTemplates(dTmpl)
+		pending     = deque()
+
+		with ProcessPoolExecutor(max_workers=workers, initializer=initParseWorker, initargs=(dTmplWorker, templateFolder, templateEngine, routerId, cacheDir, dProfile['enabled'])) as pool:
+			# Only a few logs are sent to the workers in advance, so the logs waiting to be parsed
+			# don't pile up in memory. Results are collected in the order of dLog, so the output
+			# is the same as when using one process.
+			for routerLogKey, dRouterLog in dLog:
+				if dRouterLog is None: # Not changed since the previous run
+					pending.append((routerLogKey, dState['routers'][routerLogKey]['dRouter']))
+				else:
+					pending.append((routerLogKey, pool.submit(parseRouterWorker, (routerLogKey, dRouterLog))))
+
+				if len(pending) >= 2 * workers:
+					collect(*pending.popleft())
+
+			while len(pending) > 0:
+				collect(*pending.popleft())
+	else:
+		dCmdIdx  = makeCommandIndex(dTmpl)
+
+		# Only the parsed results are kept; each log is released once parsed.
+		for routerLogKey, dRouterLog in dLog:
+			if dRouterLog is None: # Not changed since the previous run
+				collect(routerLogKey, dState['routers'][routerLogKey]['dRouter'])
+			else:
+				collect(routerLogKey, parseRouter(routerLogKey, dRouterLog, dTmpl, dCmdIdx, templateFolder, templateEngine, routerId, cacheDir))
+
+	datosEquipo		    = {}
+	noMatchedCmdAllRtr	= []
+
+	for dRouter in lRouters: #To each router
+
+		if 'calls' in dRouter:
+			dProfile['calls'].extend(dRouter.pop('calls'))
+
+		for tmpltName, cmdsLogs, dfResult, logStatus in dRouter['matched']:
+			datosEquipo = mergeParsed(datosEquipo, tmpltName, tmpltName, dTmpl[tmpltName]['valueKeys'], cmdsLogs, dfResult, logStatus)
+
+		for cmdsLogs in dRouter['noMatched'].keys():
+			if cmdsLogs not in noMatchedCmdAllRtr:
+				noMatchedCmdAllRtr.append(cmdsLogs) 
+				# Adding to list to no-matched commands, containing information of all routers
+
+	#Processing the no-matched commands
+
+	for dRouter in lRouters:
+
+		for i,cmdsLogs in enumerate(noMatchedCmdAllRtr):
+			# Here, enumerate and noMatchedCmdAllRtr are used to ensure that all no-matched commands,
+			# indenpendently of the router, will have the same identification (i).
+			# So we can keep the information of the same command together correctly
+
+			# If certain router have datosCmdsLogs, we use this information in this iteration.
+			# Otherwise, moves to the other iteration of "for" of commands.
+			if cmdsLogs not in dRouter['noMatched']:
+				continue
+
+			dfResult, logStatus = dRouter['noMatched'][cmdsLogs]
+			datosEquipo = mergeParsed(datosEquipo, f'general_{i}', GENERAL_TEMPL, ["Lines"], cmdsLogs, dfResult, logStatus)
+
+	return concatResults(datosEquipo)
+
+def alignCategories(dfPre, dfPost):
+	'''
+	Columns which are categorical in dfPre or dfPost (see compactTable) get, in both tables, the same categories:
+	the sorted union of their values. So the tables can be compared, merged and concatenated as with strings,
+	and the rows are sorted in the same order. dfPre and dfPost are modified.
+	'''
+
+	for col in dfPre.columns.intersection(dfPost.columns):
+
+		isCatPre  = isinstance(dfPre[col].dtype, pd.CategoricalDtype)
+		isCatPost = isinstance(dfPost[col].dtype, pd.CategoricalDtype)
+
+		if not (isCatPre or isCatPost) or (isCatPre and isCatPost and dfPre[col].cat.categories.equals(dfPost[col].cat.categories)):
+			continue
+
+		categories = pd.Index(dfPre[col].astype(object).dropna().unique()).union(pd.Index(dfPost[col].astype(object).dropna().unique()))
+		dtype      = pd.CategoricalDtype(categories)
+
+		dfPre[col]  = dfPre[col].astype(dtype)
+		dfPost[col] = dfPost[col].astype(dtype)
+
+	return dfPre, dfPost
+
+def diffRows(dfPre, dfPost, idxComp):
+	'''
+	Rows of dfPre which are not in dfPost (Where = PRE) and rows of dfPost which are not in dfPre (Where = POST).
+	Each row is hashed only once, and rows are compared by their hashes.
+
+	If idxComp is False, repeated rows are shown once. If idxComp is True, every repeated row is shown,
+	with its index in the pre or post table in the column IDX_PRE_POST.
+	'''
+
+	hPre  = pd.util.hash_pandas_object(dfPre,  index=False)
+	hPost = pd.util.hash_pandas_object(dfPost, index=False)
+
+	onlyPre  = ~hPre.isin(hPost.values)
+	onlyPost = ~hPost.isin(hPre.values)
+
+	if idxComp == True and (onlyPre.any() or onlyPost.any()): #Add index from pre-post table
+		dfComplPre  = dfPre[onlyPre].assign(Where=PRE)
+		dfComplPost = dfPost[onlyPost].assign(Where=POST)
+		dfComplPre[IDX_PRE_POST]  = dfComplPre.index
+		dfComplPost[IDX_PRE_POST] = dfComplPost.index
+		dfCompl = pd.concat([dfComplPre, dfComplPost], ignore_index=True)
+	else:
+		dfComplPre  = dfPre[onlyPre & ~hPre.duplicated()].assign(Where=PRE)
+		dfComplPost = dfPost[onlyPost & ~hPost.duplicated()].assign(Where=POST)
+		dfCompl = pd.concat([dfComplPre, dfComplPost])
+
+	return dfCompl
+
+def diffLines(a, b):
+	'''
+	Line diff of a and b (lists with the hashes of the lines), with the algorithm of Myers: the shortest sequence of
+	deleted and inserted lines which turns a into b. The lines common to the start and to the end are skipped first.
+	If more than DIFF_MAX_EDITS lines are deleted or inserted, the lines left are reported as a single block.
+
+	Returns:
+		list of blocks (i1, i2, j1, j2): lines a[i1:i2] replaced by b[j1:j2]. Deleted lines if j1 == j2, inserted if i1 == i2.
+	'''
+
+	head = 0
+	while head < len(a) and head < len(b) and a[head] == b[head]:
+		head += 1
+
+	tail = 0
+	while tail < len(a) - head and tail < len(b) - head and a[-1 - tail] == b[-1 - tail]:
+		tail += 1
+
+	a = a[head:len(a) - tail]
+	b = b[head:len(b) - tail]
+	n = len(a)
+	m = len(b)
+
+	if n == 0 or m == 0:
+		return [(head, head + n, head, head + m)] if n + m > 0 else []
+
+	# v[offset + k]: furthest x reached on the diagonal k = x - y. trace[d] has v(k) for k in [-d-1, d+1], before d edits.
+	maxD   = min(n + m, DIFF_MAX_EDITS)
+	offset = maxD + 1
+	v      = [0] * (2 * maxD + 3)
+	trace  = []
+	found  = False
+
+	for d in range(maxD + 1):
+		trace.append(v[offset - d - 1:offset + d + 2])
+
+		for k in range(-d, d + 1, 2):
+			if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+				x = v[offset + k + 1] # Insertion
+			else:
+				x = v[offset + k - 1] + 1 # Deletion
+			y = x - k
+
+			while x < n and y < m and a[x] == b[y]:
+				x += 1
+				y += 1
+
+			v[offset + k] = x
+
+			if x >= n and y >= m:
+				found = True
+				break
+
+		if found:
+			break
+
+	if not found:
+		return [(head, head + n, head, head + m)]
+
+	# Walk back the path, keeping the lines which are equal in a and b
+	matches = []
+	x, y    = n, m
+
+	for d in range(len(trace) - 1, -1, -1):
+		tv = trace[d]
+		k  = x - y
+
+		if k == -d or (k != d and tv[k + d] < tv[k + d + 2]):
+			prevK = k + 1
+		else:
+			prevK = k - 1
+
+		prevX = tv[prevK + d + 1]
+		prevY = prevX - prevK
+
+		while x > prevX and y > prevY:
+			x -= 1
+			y -= 1
+			matches.append((x, y))
+
+		x, y = prevX, prevY
+
+	blocks = []
+	i, j   = 0, 0
+
+	for mi, mj in matches[::-1] + [(n, m)]:
+		if mi > i or mj > j:
+			blocks.append((head + i, head + mi, head + j, head + mj))
+		i, j = mi + 1, mj + 1
+
+	return blocks
+
+def diffGeneral(dfPre, dfPost, rtrId):
+	'''
+	Changes detected for the general template, router by router. The pre and post tables are split only once by
+	router (groupby indices), and each line is hashed once. The routers with the same lines in pre and post are
+	found all at once, and the lines of the others are compared with diffLines.
+
+	Each block of lines replaced by diffLines is reported as changed lines (pairs of a pre line and a post line, in
+	that order), followed by the deleted lines or the inserted lines left, in the order of the logs.
+
+	Returns:
+		DF with the changed lines of pre (Where = PRE) and of post (Where = POST), the kind of change (CHANGE: changed,
+		deleted or inserted) and their index in the pre or post table (IDX_PRE_POST).
+	'''
+
+	gPre  = dfPre.groupby(rtrId, sort=False, observed=True).indices
+	gPost = dfPost.groupby(rtrId, sort=False, observed=True).indices
+	hPre  = pd.util.hash_pandas_object(dfPre,  index=False).to_numpy()
+	hPost = pd.util.hash_pandas_object(dfPost, index=False).to_numpy()
+	empty = np.array([], dtype=int)
+
+	routers = list(gPre.keys()) + [x for x in gPost.keys() if x not in gPre]
+	sameLen = [rtr for rtr in gPre.keys() if rtr in gPost and len(gPre[rtr]) == len(gPost[rtr])]
+
+	if len(sameLen) > 0:
+		# Routers with the same number of lines: those with all the lines equal are not compared again
+		posPre  = np.concatenate([gPre[rtr] for rtr in sameLen])
+		posPost = np.concatenate([gPost[rtr] for rtr in sameLen])
+		rtrPos  = np.repeat(np.arange(len(sameLen)), [len(gPre[rtr]) for rtr in sameLen])
+		changed = np.zeros(len(sameLen), dtype=bool)
+
+		changed[rtrPos[hPre[posPre] != hPost[posPost]]] = True
+
+		equal   = set([rtr for rtr, isChanged in zip(sameLen, changed) if not isChanged])
+		routers = [x for x in routers if x not in equal]
+
+	lRows = [] # (Where, kind of change, position in dfPre or dfPost), in the order of the report
+
+	for rtr in routers:
+		posPre  = gPre.get(rtr, empty)
+		posPost = gPost.get(rtr, empty)
+
+		for i1, i2, j1, j2 in diffLines(hPre[posPre].tolist(), hPost[posPost].tolist()):
+			nChanged = min(i2 - i1, j2 - j1)
+
+			for c in range(nChanged):
+				lRows.append((PRE,  'changed', posPre[i1 + c]))
+				lRows.append((POST, 'changed', posPost[j1 + c]))
+
+			lRows += [(PRE,  'deleted',  x) for x in posPre[i1 + nChanged:i2]]
+			lRows += [(POST, 'inserted', x) for x in posPost[j1 + nChanged:j2]]
+
+	isPre   = np.array([x[0] == PRE for x in lRows], dtype=bool)
+	lPos    = np.array([x[2] for x in lRows], dtype=int)
+	order   = np.arange(len(lRows))
+
+	dfComplPre  = dfPre.iloc[lPos[isPre]].assign(Where=PRE)
+	dfComplPost = dfPost.iloc[lPos[~isPre]].assign(Where=POST)
+
+	dfCompl = pd.concat([dfComplPre, dfComplPost], ignore_index=True)
+	dfCompl[CHANGE]       = [x[1] for x in lRows if x[0] == PRE] + [x[1] for x in lRows if x[0] == POST]
+	dfCompl[IDX_PRE_POST] = np.concatenate([lPos[isPre], lPos[~isPre]])
+
+	return dfCompl.iloc[np.argsort(np.concatenate([order[isPre], order[~isPre]]), kind='stable')]
+
+def pairLines(dfDiff):
+	'''
+	Pre-post pairs of the changes detected table of the general template (see diffGeneral): each changed pre line
+	with the post line after it, and the deleted and inserted lines on their own. Same format as pairRows.
+	'''
+
+	pairs    = []
+	dataCols = [col for col in dfDiff.columns if col not in ['Where', CHANGE, IDX_PRE_POST]]
+	values   = dfDiff[dataCols].to_numpy()
+	change   = dfDiff[CHANGE].to_numpy()
+	where    = dfDiff['Where'].to_numpy()
+
+	row = 0
+	while row < len(dfDiff):
+		if change[row] == 'changed' and row + 1 < len(dfDiff) and where[row] == PRE and where[row + 1] == POST:
+			changed = [col for col, a, b in zip(dataCols, values[row], values[row + 1]) if a != b]
+			pairs.append(dict(key=tuple(values[row]), rows=[row, row + 1], changed=changed, status='changed'))
+			row += 2
+		else:
+			pairs.append(dict(key=tuple(values[row]), rows=[row], changed=[], status='removed' if where[row] == PRE else 'added'))
+			row += 1
+
+	return pairs
+
+def pairRows(dfDiff, valueKeys):
+	'''
+	Pairs the pre and post rows of the changes detected table, using the router id (first column) and the valueKeys of the template.
+	For each key, only the first two rows are considered as the pre-post pair.
+
+	Args:
+		dfDiff (DataFrame): changes detected table, sorted and with its index reset.
+		valueKeys (list):   key columns of the template (Required, Filldown or Key values).
+
+	Returns:
+		list of dicts, one per key, in the order of dfDiff:
+			key (tuple):     router id and values of valueKeys
+			rows (list):     positions of the rows within dfDiff. One row if the key is only in pre or post.
+			changed (list):  columns with different values between both rows of the pair.
+			status (str):    changed, removed (only in pre) or added (only in post).
+	'''
+
+	pairs = []
+
+	if len(valueKeys) == 0 or len(dfDiff) == 0:
+		return pairs
+
+	keys     = [dfDiff.columns[0]] + [col for col in valueKeys if col != dfDiff.columns[0]]
+	dataCols = [col for col in dfDiff.columns if col not in ['Where', IDX_PRE_POST]]
+	# Keys in the order of their first row
+	groups   = dict(sorted(dfDiff.groupby(keys, sort=False, dropna=False, observed=True).indices.items(), key=lambda x: x[1][0]))
+
+	# The values of both rows of every pair are compared at once
+	lPairs   = [rows[:2] for rows in groups.values() if len(rows) > 1]
+	if len(lPairs) > 0:
+		first    = dfDiff[dataCols].iloc[[x[0] for x in lPairs]].to_numpy()
+		second   = dfDiff[dataCols].iloc[[x[1] for x in lPairs]].to_numpy()
+		diffMask = iter(first != second)
+
+	for key, rows in groups.items():
+
+		if len(rows) > 1:
+			changed = [col for col, isDiff in zip(dataCols, next(diffMask)) if isDiff]
+			pairs.append(dict(key=key, rows=[int(rows[0]), int(rows[1])], changed=changed, status='changed'))
+		else:
+			status = 'removed' if dfDiff['Where'].iloc[rows[0]] == PRE else 'added'
+			pairs.append(dict(key=key, rows=[int(rows[0])], changed=[], status=status))
+
+	return pairs
+
+def searchDiffAll(datosEquipoPre, datosEquipoPost, dTmplt, routerId, idxComp):
+	'''
+	Makes a new table, in which it brings the differences between two tables (post-pre)
+	'''
+
+	countDif = {}
+
+	def obtain_idx_pre_post(dfCompl,df_pre_post, where):
+		'''
+		To create new column in dfCompl. Detects the matching index from dfPre or dfPost, for each row.
+		'''
+
+		df_pre_post.insert(len(df_pre_post.columns), IDX_PRE_POST, df_pre_post.index) #To get the index in column 'index'
+		dfCompl_m = dfCompl[dfCompl['Where'] == where].drop(columns=['Where']) #This column is not in df_pre_post
+		df_merged = pd.merge(dfCompl_m,df_pre_post,how='left',on=dfCompl_m.columns.tolist())
+		
+		if where == 'left_only':
+			df_merged.insert(len(df_merged.columns)-1,'Where',PRE)
+		else:
+			df_merged.insert(len(df_merged.columns)-1,'Where',POST)
+
+		return df_merged
+
+	for tmpltName in datosEquipoPre.keys():
+		if tmpltName not in countDif:
+			countDif[tmpltName] = {}
+
+		# In datosEquipoPre[tmpltName], tmpltName can be generic_0 and that key does not exist in the templates dictionary (dTmplt).
+		# That is why it is necessary to store the template in datosEquipoPre[tmpltName]['template'], so that it can then be related
+		# to dTmplt[template] (in the examples of the generic template, template == 'generic.template').
+
+		template	= datosEquipoPre[tmpltName]['template']
+		filterCols	= dTmplt[template]['filterColumns']
+		dfPre       = datosEquipoPre[tmpltName]['dfResultDatos'].reset_index(drop=True)
+		dfPost      = datosEquipoPost[tmpltName]['dfResultDatos'].reset_index(drop=True)
+
+		alignCategories(dfPre, dfPost)
+
+		if template != GENERAL_TEMPL and dfPre.columns.equals(dfPost.columns):
+
+			dfCompl = diffRows(dfPre, dfPost, idxComp)
+
+		elif template != GENERAL_TEMPL:
+
+			# PRE and POST tables with different columns (different template folders)
+			dfUnion = pd.merge(dfPre, dfPost, how='outer', indicator='Where').drop_duplicates()
+			dfInter = dfUnion[dfUnion.Where=='both']
+			dfCompl = dfUnion[~(dfUnion.isin(dfInter))].dropna(axis=0, how='all').drop_duplicates()
+
+			if len(dfCompl) > 0 and idxComp == True: #Add index from pre-post table
+
+				dfComplPre = obtain_idx_pre_post(dfCompl,dfPre,'left_only')
+				dfComplPost = obtain_idx_pre_post(dfCompl,dfPost,'right_only')
+				dfCompl = pd.concat([dfComplPre,dfComplPost],ignore_index=True)
+			else:
+				dfCompl['Where'] = dfCompl['Where'].str.replace('left_only',PRE)
+				dfCompl['Where'] = dfCompl['Where'].str.replace('right_only',POST)
+
+		else:
+
+			rtrId   = RTR_ID[routerId][0] # This is so, because the key to identify the router can either be its name or IP
+
+			dfCompl = diffGeneral(dfPre, dfPost, rtrId)
+
+		orderedColums = RTR_ID[routerId] + filterCols
+
+		countDif[tmpltName]['valueKeys'] = datosEquipoPre[tmpltName]['valueKeys']
+
+		if template == GENERAL_TEMPL:
+			# The lines of each router are kept in the order of the diff, with the pre and post lines of each change together
+			countDif[tmpltName]['dfResultDatos'] = dfCompl.sort_values(by = RTR_ID[routerId], kind = 'stable')
+			countDif[tmpltName]['pairs'] = pairLines(countDif[tmpltName]['dfResultDatos'].reset_index(drop=True))
+		else:
+			countDif[tmpltName]['dfResultDatos'] = dfCompl.sort_values(by = orderedColums)
+			countDif[tmpltName]['pairs'] = pairRows(countDif[tmpltName]['dfResultDatos'].reset_index(drop=True), countDif[tmpltName]['valueKeys'])
+
+	return countDif
+
+def searchDiffState(datosEquipoPre, datosEquipoPost, dTmplt, routerId, idxComp, stateFile):
+	"""
+	searchDiffAll and findMajor, for an incremental run: only the templates whose pre or post tables changed
+	since the previous run (tableHash) are compared. The results of the other templates are taken from
+	stateFile, where the results of this run are stored for the next one.
+
+	Returns:
+		count_dif, searchMajor: see searchDiffAll and findMajor
+	"""
+
+	dState = readState(stateFile, stateKey(dTmplt, routerId, idxComp))
+	dState.setdefault('templates', {})
+
+	dHash = {}
+	for tmpltName in datosEquipoPre.keys():
+		dHash[tmpltName] = (datosEquipoPre[tmpltName]['template'], tableHash(datosEquipoPre[tmpltName]['dfResultDatos']), tableHash(datosEquipoPost[tmpltName]['dfResultDatos']))
+
+	changed = [x for x in datosEquipoPre.keys() if x not in dState['templates'] or dState['templates'][x]['hash'] != dHash[x]]
+
+	dfPreChanged = {x: datosEquipoPre[x] for x in changed}
+	count_dif    = searchDiffAll(dfPreChanged, datosEquipoPost, dTmplt, routerId, idxComp)
+	searchMajor  = findMajor(count_dif, dTmplt, routerId, datosEquipoPre)
+
+	for tmpltName in changed:
+		dState['templates'][tmpltName] = dict(hash = dHash[tmpltName], count_dif = count_dif[tmpltName], searchMajor = searchMajor[tmpltName])
+
+	dState['templates'] = {x: dState['templates'][x] for x in datosEquipoPre.keys()}
+
+	writeState(stateFile, dState)
+
+	print(f'##### Incremental run: {len(changed)} of {len(datosEquipoPre)} templates compared #####')
+
+	count_dif   = {x: dState['templates'][x]['count_dif'] for x in datosEquipoPre.keys()}
+	searchMajor = {x: dState['templates'][x]['searchMajor'] for x in datosEquipoPre.keys()}
+
+	return count_dif, searchMajor
+
+def matchMajor(df, majorWords):
+	"""
+	Looks for the major words in the string columns of df, column by column and case insensitive.
+	The rows are first filtered with a single pattern, built with all the major words; then,
+	each word is searched only within those rows.
+
+	Args:
+		df (DataFrame):    rows of the post table
+		majorWords (list): major words (regex) of the template
+
+	Returns:
+		list of DFs, one per major word, with the rows of df that match that word.
+	"""
+
+	strCols = [col for col in df.columns if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)]
+
+	def matchWord(dfCand, word):
+		mask = pd.Series(False, index=dfCand.index)
+		for col in strCols:
+			mask = mask | dfCand[col].str.contains(word, case=False, na=False)
+		return mask
+
+	allWords = '|'.join(['(?:' + word + ')' for word in majorWords])
+	dfCand   = df[matchWord(df, allWords)]
+
+	return [dfCand[matchWord(dfCand, word)] for word in majorWords]
+
+def findMajor(count_dif, dTmplt, routerId, datosEquipoPre):
+	'''
+	Makes a table from the results of searching for Major errors in the post table define in yml file for specific template,\n
+	or down if is not define the words for the template, which are not in the Pre table
+	'''
+
+	countDown  = {}
+	
+	for tmpltName in count_dif.keys():
+		if tmpltName not in countDown:
+			countDown[tmpltName] = {}
+
+		df = pd.DataFrame()
+		template   = datosEquipoPre[tmpltName]['template']
+		majorWords = dTmplt[template]['majorDown']
+		filterCols = dTmplt[template]['filterColumns']
+		dfDiff     = count_dif[tmpltName]['dfResultDatos']
+
+		if 'Where' in dfDiff.columns and len(majorWords) > 0:
+
+			df1 = dfDiff[dfDiff['Where']==POST]
+
+			if len(df1) > 0:
+				# A row appears once per major word found in it
+				df = pd.concat(matchMajor(df1, majorWords))
+			else:
+				df = pd.DataFrame(columns=dfDiff.columns)
+
+			df = df.sort_values(by = RTR_ID[routerId] + filterCols)
+
+		df = df.reset_index(drop=True)
+		countDown[tmpltName]['dfResultDatos'] = df
+
+	return countDown
+
+def makeTable(datosEquipoPre, datosEquipoPost):
+	'''
+	Sort the table pre and post to present in Excel.
+	The table of each template is a list of blocks (key, DataFrame): the pre and post tables are not
+	concatenated, but referenced, and constructExcel writes them side by side (see writeTable).
+	'''
+
+	df_all          = {}
+	
+	for tmpltName in datosEquipoPre.keys():
+		if tmpltName not in df_all:
+				df_all[tmpltName] = {}
+
+		dfPre  = datosEquipoPre[tmpltName]['dfResultDatos']
+		dfPost = datosEquipoPost[tmpltName]['dfResultDatos']
+		df_all[tmpltName]['dfResultDatos']	= [('Pre-Check', dfPre), ('Post-Check', dfPost)]
+
+		df_all[tmpltName]['parseStatus']	= datosEquipoPost[tmpltName]['parseStatus']
+		df_all[tmpltName]['command']		= datosEquipoPre[tmpltName]['command']
+
+	return df_all
+
+def detStatus(parseStatus, dfDiff, dfMajor):
+	"""
+	Final status of a template, key of D_STATUS: the parseStatus, or the result of the comparison
+	between pre and post logs (ok, changes_detected, major_errors).
+	"""
+
+	if parseStatus not in ['ok','changes_detected','major_errors']:
+		output = parseStatus
+	elif len(dfMajor) == 0 and len(dfDiff) == 0:
+		output = 'ok'
+	elif len(dfMajor) == 0 and len(dfDiff) != 0:
+		output = 'changes_detected'
+	elif len(dfMajor) != 0:
+		output = 'major_errors'
+
+	return output
+
+def exportTables(datosEquipoPre, datosEquipoPost, count_dif, searchMajor, folderLog, outputFormat):
+	"""
+	Writes the tables of each template in one or more columnar formats (parquet and/or feather), inside the folder
+	folderLog[:-1] + '_tables/', together with a single manifest (manifest.json) listing the files of every format.
+	Requires pyarrow.
+
+	Args:
+		datosEquipoPre (dict):  parsed results of pre logs
+		datosEquipoPost (dict): parsed results of post logs. None, if only pre logs were parsed.
+		count_dif (dict):       changes detected, from searchDiffAll
+		searchMajor (dict):     major errors, from findMajor
+		folderLog (string):     name of the folder
+		outputFormat (list):    formats to be written: parquet and/or feather
+	"""
+
+	try:
+		import pyarrow
+	except ImportError:
+		print(f'The output format {" and ".join(outputFormat)} requires the module pyarrow. Please install it (pip install pyarrow).\nQuitting...')
+		quit()
+
+	tableFolder = folderLog[:-1] + '_tables/'
+	os.makedirs(tableFolder, exist_ok=True)
+
+	print(f'\nSaving {" and ".join(outputFormat)} tables in {tableFolder}')
+
+	manifest = dict(
+		formats   = outputFormat,
+		templates = [],
+	)
+
+	for template in datosEquipoPre.keys():
+
+		dTables = dict(
+			pre   = datosEquipoPre[template]['dfResultDatos'],
+			post  = datosEquipoPost[template]['dfResultDatos'] if datosEquipoPost is not None else None,
+			diff  = count_dif[template]['dfResultDatos'],
+			major = searchMajor[template]['dfResultDatos'],
+		)
+
+		parseStatus = datosEquipoPost[template]['parseStatus'] if datosEquipoPost is not None else datosEquipoPre[template]['parseStatus']
+
+		dManifest = dict(
+			name     = template,
+			template = datosEquipoPre[template]['template'],
+			command  = datosEquipoPre[template]['command'],
+			status   = detStatus(parseStatus, dTables['diff'], dTables['major']),
+			tables   = {},
+		)
+
+		for table, df in dTables.items():
+			# Tables without columns (e.g. major errors of templates without comparison) are not written
+			if df is None or len(df.columns) == 0:
+				continue
+
+			df    = df.reset_index(drop=True)
+			df.columns = [str(col) for col in df.columns]
+			dFiles = {}
+
+			for fmt in outputFormat:
+				fName = template.replace('/','_') + '_' + table + '.' + fmt
+
+				if fmt == 'parquet':
+					df.to_parquet(tableFolder + fName, index=False)
+				else:
+					df.to_feather(tableFolder + fName)
+
+				dFiles[fmt] = fName
+
+			dManifest['tables'][table] = dict(files = dFiles, rows = len(df), columns = list(df.columns))
+
+		manifest['templates'].append(dManifest)
+
+	with open(tableFolder + 'manifest.json', 'w') as f:
+		json.dump(manifest, f, indent=2)
+
+def constructExcel(df_final, count_dif, searchMajor, folderLog, lowMemory=False, reportMode='full'):
+	"""
+	Sort the data and format creating the Excel
+	_summary_
+
+	Args:
+		df_final (pandas): DataFrame with pre and post data
+		count_dif (pandas): DataFrame with only differences
+		searchMajor (pandas): DataFrame with only errors
+		folderLog (string): name of the folder
+		lowMemory (bool): if True, rows are flushed to disk as soon as they are written (XlsxWriter constant_memory),
+			so the workbook is never fully held in memory.
+		reportMode (string): full or summary. With summary, templates with status ok only have an entry in the index,
+			with their number of rows, and no tab.
+	"""
+
+	def getFormat(props):
+		"""
+		Returns a format with the properties props. Each distinct format is added to the workbook only once.
+		"""
+
+		key = tuple(sorted(props.items()))
+		if key not in dFormats:
+			dFormats[key] = workbook.add_format(props)
+
+		return dFormats[key]
+
+	def diff_colors(pairs,dfDiff,end_col):
+		"""
+		Highlights the pre-post pairs of the changes detected table: cells with different values in red,
+		and borders below each pair.
+
+		Returns:
+			dict (row, col): properties of the format of that cell. Rows are relative to dfDiff, and
+			columns are those of the worksheet (the index is in the column 0).
+		"""
+
+		dCells = {}
+		blanks = (dfDiff.isna() | dfDiff.apply(lambda col: col.astype(str).str.strip() == '')).to_numpy()
+
+		def addProps(row, col, props, onlyNoBlanks):
+			if onlyNoBlanks and blanks[row, col - 1]:
+				return
+			dCells.setdefault((row, col), {}).update(props)
+
+		for pair in pairs: #Pre-post pairs, obtained by searchDiffAll
+			row_pair = pair['rows'] #Indices of the pre-post pair rows
+
+			if len(row_pair) > 1 and len(pair['changed']) > 0: # If there's a pre AND post pair
+				for col in pair['changed']:
+					col_idx = dfDiff.columns.get_loc(col)
+					for row in range(row_pair[0], row_pair[1] + 1): #Coloring
+						addProps(row, col_idx + 1, {'bg_color': '#FFC7CE'}, True)
+
+				addProps(row_pair[1], 1, {'bottom': 1,'left':1}, True) #Fixing the first column
+				for col in range(2, end_col + 1): #Black line below, until the end of dfDiff
+					addProps(row_pair[1], col, {'bottom': 1}, False)
+
+			elif len(row_pair) == 1: #Just one pre/post line
+				addProps(row_pair[0], 1, {'bottom': 1,'left':1}, True) #Fixing the first column
+				for col in range(2, end_col + 1): #Black line below and above, until the end of dfDiff
+					addProps(row_pair[0], col, {'bottom': 1,'top': 1}, False)
+
+		return dCells
+
+	def lenTable(df):
+		"""
+		Number of rows of df, or of the longest block if df is a list of blocks (see makeTable).
+		"""
+
+		if isinstance(df, list):
+			return max([len(dfBlock) for key, dfBlock in df], default=0)
+
+		return len(df)
+
+	def cellValue(value):
+		"""
+		Value of a cell, converted as ExcelWriter._value_with_fmt does: numbers, bools and dates are written
+		as they are, and any other value (e.g. the lists of the results of ttp) as a string.
+
+		Returns:
+			the value to be written, or None for empty cells (NaN, None)
+		"""
+
+		if pd.api.types.is_scalar(value) and pd.isna(value):
+			return None
+
+		if pd.api.types.is_integer(value):
+			return int(value)
+		elif pd.api.types.is_float(value):
+			return float(value)
+		elif pd.api.types.is_bool(value):
+			return bool(value)
+		elif isinstance(value, datetime.date):
+			return value
+		else:
+			return str(value)
+
+	def writeTable(worksheet, df, startrow, dCells={}):
+		"""
+		Writes df in the worksheet, as DataFrame.to_excel does: header and index with HEADER_FORMAT,
+		NaN as empty cells. The cells in dCells (see diff_colors) are written with their own format.
+		Cells are written row by row, so it can be used with the option constant_memory of the workbook.
+
+		df can also be a list of blocks (key, DataFrame), as returned by makeTable. The blocks are written
+		in adjacent columns, as pd.concat(axis=1, keys=...) would be, but without building that table: the
+		key is merged above the columns of each block, an empty row is left below the header, and the first
+		cell of the header is left to the caller (link to the index). Rows are numbered from 0, and the cells
+		of a block below its last row are left empty.
+
+		Returns:
+			number of rows written, header included.
+		"""
+
+		headerFormat = getFormat(HEADER_FORMAT)
+
+		if isinstance(df, list):
+			blocks = df
+
+			j = 1
+			for key, dfBlock in blocks:
+				span = len(dfBlock.columns)
+				if span > 1:
+					worksheet.merge_range(startrow, j, startrow, j + span - 1, key, headerFormat)
+				elif span == 1:
+					worksheet.write(startrow, j, key, headerFormat)
+				j = j + span
+
+			worksheet.write_blank(startrow + 1, 0, None, headerFormat)
+
+			j = 1
+			for key, dfBlock in blocks:
+				for col in dfBlock.columns:
+					worksheet.write(startrow + 1, j, col, headerFormat)
+					j = j + 1
+
+			firstRow = startrow + 3
+			index    = range(lenTable(blocks))
+		else:
+			blocks = [(None, df)]
+
+			for j, col in enumerate(df.columns):
+				worksheet.write(startrow, j + 1, col, headerFormat)
+
+			firstRow = startrow + 1
+			index    = df.index
+
+		# Rows of each block, with their length and first column in the worksheet
+		lRows = []
+		j = 1
+		for key, dfBlock in blocks:
+			lRows.append((dfBlock.itertuples(index=False, name=None), len(dfBlock), j))
+			j = j + len(dfBlock.columns)
+
+		for i, idx in enumerate(index):
+			r = firstRow + i
+			worksheet.write(r, 0, idx.item() if hasattr(idx, 'item') else idx, headerFormat)
+
+			for rows, nRows, firstCol in lRows:
+				if i >= nRows:
+					continue
+
+				for j, value in enumerate(next(rows), firstCol):
+					fmt = getFormat(dCells[(i, j)]) if (i, j) in dCells else None
+
+					value = cellValue(value)
+
+					if value is None:
+						if fmt is not None:
+							worksheet.write_blank(r, j, None, fmt)
+					else:
+						worksheet.write(r, j, value, fmt)
+
+		return firstRow - startrow + len(index)
+
+	fileName  = folderLog[:-1] + ".xlsx"
+
+	writer    = pd.ExcelWriter(fileName, engine='xlsxwriter', engine_kwargs={'options': {'constant_memory': lowMemory}}) #creates instance of an excel workbook
+	workbook  = writer.book
+	dFormats  = {} # Formats already added to the workbook; see getFormat
+
+	# Create index tab
+	indexSheet = workbook.add_worksheet('index')
+
+	# Building index. With constant_memory, rows must be written in order: the header goes first.
+	for k, i_dict in INDEX_COL.items():
+		indexSheet.write(0,i_dict['position'],i_dict['colName'], getFormat({'font_size':CELL_FONT_SIZE,'align':'center','border':1,'bold':True}))
+		indexSheet.set_column(i_dict['col'],i_dict['width'])
+
+	if reportMode == 'summary':
+		indexSheet.write(0,INDEX_COL_ROWS['position'],INDEX_COL_ROWS['colName'], getFormat({'font_size':CELL_FONT_SIZE,'align':'center','border':1,'bold':True}))
+		indexSheet.set_column(INDEX_COL_ROWS['col'],INDEX_COL_ROWS['width'])
+
+	print('\nSaving Excel')
+
+	for idx,template in enumerate(df_final.keys()):
+
+		dfData  = df_final[template]['dfResultDatos']
+		nData   = lenTable(dfData)
+		dfDiff  = count_dif[template]['dfResultDatos'].reset_index(drop=True)
+		dfMajor = searchMajor[template]['dfResultDatos']
+		dfParseStatus = df_final[template]['parseStatus']
+
+		sheet_name = template.replace('nokia_sros_','')
+		sheet_name = sheet_name.replace('.template','')
+		sheet_name = sheet_name.replace('_template','')
+		sheet_name = sheet_name.replace('.ttp','')
 		sheet_name = sheet_name.replace('.','_')
 
-		if len(sheet_name) > 31:
-			sheet_name = sheet_name[:31]
+		if len(sheet_name) > 31:
+			sheet_name = sheet_name[:31]
+
+		# Selecting Tab's color and error messages
+		output = detStatus(dfParseStatus, dfDiff, dfMajor)
+
+		# cell format
+		cell_format  = getFormat({'color': CELL_COLOR, 'font_size': CELL_FONT_SIZE, 'fg_color': D_STATUS[output]['colorTab'], 'align': 'center', 'border': 1 ,'bold': True})
+
+		srcCol   = 'A'+str(idx+1)
+
+		if reportMode == 'summary':
+			indexSheet.write(idx+1,INDEX_COL_ROWS['position'], nData)
+
+			if output == 'ok':
+				# Nothing to check: only the entry in the index, without tab
+				indexSheet.write(idx+1,0, sheet_name)
+				indexSheet.write(idx+1,1, df_final[template]['command'])
+				indexSheet.write(idx+1,2, D_STATUS[output]['shortText'], cell_format)
+				print('#',idx,template)
+				continue
+
+		indexSheet.write_url(idx+1,0, 'internal:'+sheet_name+'!A1', string=sheet_name)
+		indexSheet.write(idx+1,1, df_final[template]['command'])
+		indexSheet.write(idx+1,2, D_STATUS[output]['shortText'], cell_format)
+
+		# Creating Tab
+		worksheet = workbook.add_worksheet(sheet_name)
+		worksheet.set_tab_color(D_STATUS[output]['colorTab'])
+		writer.sheets[sheet_name] = worksheet
+		worksheet.write_url('A1', 'internal:index!A1', string='Index')
+		writeTable(worksheet, dfData, 0)
+
+		# Changes Section
+		if len(dfDiff) > 0:
+			srcCol   = 'A'+str(nData+5)
+			dstCol   = 'J'+str(nData+5)
+			colRange = srcCol + ':' + dstCol
+			warnTex  = D_STATUS[output]['warnText']
+			worksheet.merge_range(colRange, warnTex, cell_format)
+
+			if len(dfDiff) > 0:
+				valueKeys = count_dif[template]['valueKeys']
+				end_col = len(dfDiff.columns)
+
+				if len(valueKeys) > 0:
+					dCells = diff_colors(count_dif[template]['pairs'],dfDiff,end_col)
+				else:
+					dCells = {}
+
+				writeTable(worksheet, dfDiff, nData+6, dCells)
+
+		# Major Error Section
+		if len(dfMajor) > 0:
+			srcCol   = 'A'+str((nData+(len(dfDiff)))+9)
+			dstCol   = 'J'+str((nData+(len(dfDiff)))+9)
+			colRange = srcCol + ':' + dstCol
+			errText   = warnTex  = D_STATUS[output]['errText']
+			worksheet.merge_range(colRange, errText, cell_format)
+			if len(dfMajor) > 0:
+				writeTable(worksheet, dfMajor, (nData+(len(dfDiff)))+10)
+
+		print('#',idx,template)
+	
+	writer.close() #saves workbook to file in python file directory
+
+def atpDocument():
+	"""
+	Empty ATP document, with the style Console used for the outputs of the commands.
+	"""
+
+	import docx
+	from docx.enum.style import WD_STYLE_TYPE
+	from docx.enum.text import WD_LINE_SPACING
+	from docx.shared import Pt
+
+	myDoc    = docx.Document()
+	myStyles = myDoc.styles
+
+	styleConsole = myStyles.add_style('Console', WD_STYLE_TYPE.PARAGRAPH)
+	styleConsole.font.name = 'Courier'
+	styleConsole.font.size = Pt(9)
+	styleConsole.paragraph_format.keep_together = True
+
+	styleConsole.paragraph_format.line_spacing_rule = WD_LINE_SPACING.SINGLE
+	#styleConsole.paragraph_format.line_spacing = Pt(10)
+	#styleConsole.paragraph_format.line_spacing = .2
+	styleConsole.paragraph_format.space_after = Pt(2)
+
+	return myDoc
+
+def initAtpWorker():
+	"""
+	Initializer of the worker processes of renderAtp. Each worker builds its own document, once,
+	where the sections of the routers are rendered.
+	"""
+
+	dWorker['atpDoc'] = atpDocument()
 
-		# Selecting Tab's color and error messages
-		if dfParseStatus not in ['ok','changes_detected','major_errors']:
-			output = dfParseStatus
-		elif len(dfMajor) == 0 and len(dfDiff) == 0:
-			output = 'ok'
-		elif len(dfMajor) == 0 and len(dfDiff) != 0:
-			output = 'changes_detected'
-		elif len(dfMajor) != 0:
-			output = 'major_errors'
+def renderAtpRouter(fileName):
+	"""
+	Renders the section of a router in the ATP: title of the router, and title and output of each show command.
+	The paragraphs are built in the document of the worker (see initAtpWorker) and removed from it once serialized.
 
-		# cell format
-		cell_format  = workbook.add_format({'color': CELL_COLOR, 'font_size': CELL_FONT_SIZE, 'fg_color': D_STATUS[output]['colorTab'], 'align': 'center', 'border': 1 ,'bold': True})
+	Args:
+		fileName (string): json log of taskAutom
 
-		srcCol   = 'A'+str(idx+1)
+	Returns:
+		title of the router, and list of the paragraphs of the section, as XML
+	"""
 
-		# Building index
-		for k, i_dict in INDEX_COL.items():
-			indexSheet.write(0,i_dict['position'],i_dict['colName'], workbook.add_format({'font_size':CELL_FONT_SIZE,'align':'center','border':1,'bold':True}))
-			indexSheet.set_column(i_dict['col'],i_dict['width'])
+	from lxml import etree
 
-		indexSheet.write_url(idx+1,0, 'internal:'+sheet_name+'!A1', string=sheet_name)
-		indexSheet.write(idx+1,1, df_final[template]['command'])
-		indexSheet.write(idx+1,2, D_STATUS[output]['shortText'], cell_format)
+	myDoc = dWorker['atpDoc']
 
-		# Creating Tab
-		worksheet = workbook.add_worksheet(sheet_name)
-		worksheet.set_tab_color(D_STATUS[output]['colorTab'])
-		writer.sheets[sheet_name] = worksheet
-		dfData.to_excel(writer, sheet_name=sheet_name, startrow=0, startcol=0) #Creates Excel File
-		worksheet.write_url('A1', 'internal:index!A1', string='Index')
+	with open(fileName) as myFile:
+		logs = json.load(myFile)
 
-		# Changes Section
-		if len(dfDiff) > 0 or output=='ambiguity':
-			srcCol   = 'A'+str(len(dfData)+5)
-			dstCol   = 'J'+str(len(dfData)+5)
-			colRange = srcCol + ':' + dstCol
-			warnTex  = D_STATUS[output]['warnText']
-			worksheet.merge_range(colRange, warnTex, cell_format)
+	keys = [x for x in logs.keys() if 'show' in x]
 
-			if len(dfDiff) > 0:
-				valueKeys = count_dif[template]['valueKeys']
-				dfDiff.to_excel(writer, sheet_name=sheet_name, startrow=len(dfData)+6, startcol=0)
-				start_row = len(dfData) + 7
-				end_col = len(dfDiff.columns)
+	routerTitle = f'Router {logs["name"]} ({logs["ip"]})'
 
-				if len(valueKeys) > 0:
-					diff_colors(valueKeys,dfDiff,start_row,worksheet,end_col)
+	docRouterTitle = myDoc.add_paragraph(routerTitle)
+	docRouterTitle.style = myDoc.styles['Heading 2']
+	docRouterTitle.paragraph_format.line_spacing = 1.5
 
-		# Major Error Section
-		if len(dfMajor) > 0:
-			srcCol   = 'A'+str((len(dfData)+(len(dfDiff)))+9)
-			dstCol   = 'J'+str((len(dfData)+(len(dfDiff)))+9)
-			colRange = srcCol + ':' + dstCol
-			errText   = warnTex  = D_STATUS[output]['errText']
-			worksheet.merge_range(colRange, errText, cell_format)
-			if len(dfMajor) > 0:
-				dfMajor.to_excel(writer, sheet_name=sheet_name, startrow=(len(dfData)+(len(dfDiff)))+10, startcol=0)
+	lParagraphs = [docRouterTitle]
 
-		print('#',idx,template)
-	
-	writer.close() #saves workbook to file in python file directory
+	for key in keys:
+		showTitle   = key.rstrip('\n').lstrip('\n')
+		showContent = ATP_DISCARD.sub('', logs[key]).rstrip('\n').lstrip('\n')
+
+		docShowTitle = myDoc.add_paragraph(showTitle)
+		docShowTitle.style = myDoc.styles['Heading 3']
+		docShowTitle.paragraph_format.line_spacing = 1.5
+
+		docShowContent = myDoc.add_paragraph(showContent)
+		docShowContent.style = myDoc.styles['Console']
+
+		lParagraphs.extend([docShowTitle, docShowContent])
+
+	lXml = []
+	for paragraph in lParagraphs:
+		lXml.append(etree.tostring(paragraph._p))
+		paragraph._p.getparent().remove(paragraph._p)
+
+	return routerTitle, lXml
+
+def iterAtpSections(jsonFiles, pool, workers):
+	"""
+	Renders the sections of the routers of jsonFiles with renderAtpRouter: in the pool, if not None,
+	or in this process. Only a few routers are sent in advance to the workers, so the rendered sections
+	don't pile up in memory.
+
+	Yields: (routerTitle, lXml), in the order of jsonFiles
+	"""
+
+	if pool is None:
+		for fileName in jsonFiles:
+			yield renderAtpRouter(fileName)
+		return
+
+	pending = deque()
+
+	for fileName in jsonFiles:
+		pending.append(pool.submit(renderAtpRouter, fileName))
+		if len(pending) >= 2 * workers:
+			yield pending.popleft().result()
+
+	while len(pending) > 0:
+		yield pending.popleft().result()
 
 def renderAtp(dictParam):
 	"""[Generates a ATP based on the json logs obtained from taskAutom.]
 
+	The section of each router is rendered by renderAtpRouter, in a pool of dictParam['workers'] processes
+	if workers > 1, and the sections are added to the document in the order of the logs.
+
+	With dictParam['atpSplit'] = router or size, the ATP is split in several documents, inside the folder ./ATP/:
+	one per router, or one each time the sections added reach dictParam['atpSize'] MB of XML. Each document is
+	saved and released as soon as it is complete, and an index document (ATP_index.docx) lists the routers
+	of each one.
+
 	Args:
 		dictParam
 
@@ -904,99 +2118,330 @@ def renderAtp(dictParam):
 		None
 	"""
 
+	def newChunk():
+		"""
+		Starts a new document of the ATP.
+		"""
+
+		if atpSplit == 'no':
+			fileName = job0docx
+		else:
+			fileName = atpFolder + f'ATP_{len(lChunks)+1:04d}.docx'
+
+		lChunks.append(fileName)
+
+		myDoc = atpDocument()
+		myDoc.add_heading('ATP', 0)
+
+		return dict(doc = myDoc, fileName = fileName, check = None, size = 0)
+
+	def addCheck(dChunk, checkTitle):
+		"""
+		Adds the title of the check (Pre-Check, Post-Check) to the document, if not added yet.
+		"""
+
+		if dChunk['check'] != checkTitle:
+			myDoc = dChunk['doc']
+
+			docMainTitle = myDoc.add_paragraph(checkTitle)
+			docMainTitle.style = myDoc.styles['Heading 1']
+			docMainTitle.paragraph_format.line_spacing = 1.5
+
+			dChunk['check'] = checkTitle
+
+	from docx.oxml import parse_xml
+
 	preFolder  = dictParam['preFolder']
 	postFolder = dictParam['postFolder']
+	workers    = dictParam['workers']
+	atpSplit   = dictParam['atpSplit']
+	atpSize    = dictParam['atpSize']
 
 	jsonFilesPre = [preFolder+x for x in os.listdir(preFolder) if '.json' in x and x != '00_report.json']
 	if postFolder != '':
 		jsonFilesPos = [postFolder+x for x in os.listdir(postFolder) if '.json' in x and x != '00_report.json']
 
-	job0docx = "./ATP.docx"
-
-	print("\nGenerating ATP: " + job0docx)
+	job0docx  = "./ATP.docx"
+	atpFolder = "./ATP/"
 
-	myDoc    = docx.Document()
-	myStyles = myDoc.styles
+	if atpSplit == 'no':
+		print("\nGenerating ATP: " + job0docx)
+	else:
+		print("\nGenerating ATP: " + atpFolder)
+		os.makedirs(atpFolder, exist_ok=True)
 
-	styleConsole = myStyles.add_style('Console', WD_STYLE_TYPE.PARAGRAPH)
-	styleConsole.font.name = 'Courier'
-	styleConsole.font.size = Pt(9)
-	styleConsole.paragraph_format.keep_together = True
+	lChecks = []
 
-	styleConsole.paragraph_format.line_spacing_rule = WD_LINE_SPACING.SINGLE
-	#styleConsole.paragraph_format.line_spacing = Pt(10)
-	#styleConsole.paragraph_format.line_spacing = .2
-	styleConsole.paragraph_format.space_after = Pt(2)
+	if preFolder != '':
+		lChecks.append(('Pre-Check', jsonFilesPre))
 
-	myDoc.add_heading('ATP', 0)
+	if postFolder != '':
+		lChecks.append(('Post-Check', jsonFilesPos))
 
-	charset_allowed = [chr(c) for c in range(32,127)] + ['\n']
+	if workers > 1:
+		pool = ProcessPoolExecutor(max_workers=workers, initializer=initAtpWorker)
+	else:
+		pool = None
+		initAtpWorker()
 
-	if preFolder != '':
+	lChunks = [] # Documents of the ATP
+	lIndex  = [] # (document, check, router), for the index document
+	dChunk  = newChunk() if atpSplit == 'no' else None
 
-		docMainTitle = myDoc.add_paragraph('Pre-Check')
-		docMainTitle.style = myDoc.styles['Heading 1']
-		docMainTitle.paragraph_format.line_spacing = 1.5
+	for checkTitle, jsonFiles in lChecks:
 
-		for f in jsonFilesPre:
-			
-			with open(f) as myFile:
-				
-				logs  = json.load(myFile)
-				keys  = [x for x in logs.keys() if 'show' in x]
+		if dChunk is not None:
+			addCheck(dChunk, checkTitle)
 
-				routerTitle = f'Router {logs["name"]} ({logs["ip"]})'
+		for routerTitle, lXml in iterAtpSections(jsonFiles, pool, workers):
+			size = sum([len(xml) for xml in lXml])
 
-				docRouterTitle = myDoc.add_paragraph(routerTitle)
-				docRouterTitle.style = myDoc.styles['Heading 2']
-				docRouterTitle.paragraph_format.line_spacing = 1.5
+			if dChunk is not None and (atpSplit == 'router' or (atpSplit == 'size' and dChunk['size'] > 0 and dChunk['size'] + size > atpSize * 1024 * 1024)):
+				# The document is complete: saved and released. The objects of python-docx have reference
+				# cycles, so they are only freed by the garbage collector.
+				dChunk['doc'].save(dChunk['fileName'])
+				dChunk = None
+				body   = None
+				gc.collect()
 
-				for key in keys:
-					showTitle   = key.rstrip('\n').lstrip('\n')
-					showContent = ''.join([x for x in logs[key] if x in charset_allowed]).rstrip('\n').lstrip('\n')
+			if dChunk is None:
+				dChunk = newChunk()
 
-					docShowTitle = myDoc.add_paragraph(showTitle)
-					docShowTitle.style = myDoc.styles['Heading 3']
-					docShowTitle.paragraph_format.line_spacing = 1.5
+			addCheck(dChunk, checkTitle)
 
-					docShowContent = myDoc.add_paragraph(showContent)
-					docShowContent.style = myDoc.styles['Console']
+			body = dChunk['doc'].element.body
+			for xml in lXml:
+				body.sectPr.addprevious(parse_xml(xml))
 
-	if postFolder != '':
+			dChunk['size'] = dChunk['size'] + size
+			lIndex.append((os.path.basename(dChunk['fileName']), checkTitle, routerTitle))
 
-		docMainTitle = myDoc.add_paragraph('Post-Check')
-		docMainTitle.style = myDoc.styles['Heading 1']
-		docMainTitle.paragraph_format.line_spacing = 1.5
+	if pool is not None:
+		pool.shutdown()
 
-		for f in jsonFilesPos:
-			
-			with open(f) as myFile:
-				
-				logs  = json.load(myFile)
-				keys  = [x for x in logs.keys() if 'show' in x]
+	if dChunk is not None:
+		dChunk['doc'].save(dChunk['fileName'])
+		dChunk = None
 
-				routerTitle = f'Router {logs["name"]} ({logs["ip"]})'
+	if atpSplit != 'no':
+		myDoc = atpDocument()
+		myDoc.add_heading('ATP', 0)
 
-				docRouterTitle = myDoc.add_paragraph(routerTitle)
-				docRouterTitle.style = myDoc.styles['Heading 2']
-				docRouterTitle.paragraph_format.line_spacing = 1.5
+		table = myDoc.add_table(rows=1, cols=3)
+		table.style = myDoc.styles['Table Grid']
 
-				for key in keys:
-					showTitle   = key.rstrip('\n').lstrip('\n')
-					showContent = ''.join([x for x in logs[key] if x in charset_allowed]).rstrip('\n').lstrip('\n')
+		for cell, text in zip(table.rows[0].cells, ['Document','Check','Router']):
+			cell.text = text
 
-					docShowTitle = myDoc.add_paragraph(showTitle)
-					docShowTitle.style = myDoc.styles['Heading 3']
-					docShowTitle.paragraph_format.line_spacing = 1.5
+		for row in lIndex:
+			for cell, text in zip(table.add_row().cells, row):
+				cell.text = text
 
-					docShowContent = myDoc.add_paragraph(showContent)
-					docShowContent.style = myDoc.styles['Console']
+		myDoc.save(atpFolder + 'ATP_index.docx')
 
-	myDoc.save(job0docx)
+		print(f'{len(lChunks)} documents and index written in {atpFolder}')
 
 	print("ATP done...")
 
-def fncRun(dictParam):
+# Profile of the run (see --profile): stages of fncRun, and parse calls (router, template, wall time, CPU time, rows)
+PROFILE_TOP      = 20 # Slowest parse calls in the profile
+PROFILE_DISPATCH = '(matchTemplates)' # Template name of the calls to matchTemplates in the profile
+
+dProfile = dict(
+	enabled = False,
+	stages  = [],
+	calls   = [],
+)
+
+def resetPeakRss():
+	"""
+	Resets the peak resident memory of the process (VmHWM), writing 5 in /proc/self/clear_refs, so that
+	peakRss gives the peak since this call. Only on Linux.
+
+	Returns:
+		True if the peak was reset, False if it can't be reset in this platform.
+	"""
+
+	try:
+		with open('/proc/self/clear_refs', 'w') as f:
+			f.write('5')
+	except OSError:
+		return False
+
+	return True
+
+def peakRss():
+	"""
+	Peak resident memory of the process, in MB, since the last resetPeakRss (VmHWM of /proc/self/status).
+	None if it is not available (other than Linux).
+	"""
+
+	try:
+		with open('/proc/self/status') as f:
+			for line in f:
+				if line.startswith('VmHWM:'):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+
+	return None
+
+def childrenPeakRss():
+	"""
+	Peak resident memory, in MB, of the largest finished child process (workers) since the start of the
+	run. None if the module resource is not available (Windows).
+	"""
+
+	if resource is None:
+		return None
+
+	rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+	return rss / 1024 / 1024 if _platform == 'darwin' else rss / 1024
+
+def cpuTime():
+	"""
+	CPU time of the process, plus the CPU time of its finished child processes (workers).
+	"""
+
+	if resource is None:
+		return time.process_time()
+
+	children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+	return time.process_time() + children.ru_utime + children.ru_stime
+
+def profileCall(routerName, tmpltName, t0, dfResult=None):
+	"""
+	Records a parse call in the profile. t0 is (wall time, CPU time) at the start of the call. dfResult are the
+	parsed results, whose rows and memory (deep, in MB) are recorded; taken after the times, so they are not counted.
+	"""
+
+	wall = time.perf_counter() - t0[0]
+	cpu  = time.process_time() - t0[1]
+
+	if dfResult is None:
+		rows, mem = 0, 0.0
+	else:
+		rows, mem = len(dfResult), dfResult.memory_usage(deep=True).sum() / 1024 / 1024
+
+	dProfile['calls'].append((routerName, tmpltName, wall, cpu, rows, mem))
+
+def runStage(stage, fn, *args):
+	"""
+	Runs fn(*args). With --profile, the wall time, CPU time and peak memory of the stage are recorded.
+
+	The peak memory is that of the main process during the stage: its peak resident memory, reset before
+	the stage (resetPeakRss), or, where it can't be reset, the peak of the memory allocated by Python
+	(tracemalloc), which is slower and doesn't count the memory allocated by C extensions. The column
+	peakMethod tells which one was used. The peak of the workers is given by childrenPeakRss_MB.
+	"""
+
+	if not dProfile['enabled']:
+		return fn(*args)
+
+	useRss = resetPeakRss() and peakRss() is not None
+
+	if not useRss:
+		import tracemalloc
+		startTrace = not tracemalloc.is_tracing()
+		if startTrace:
+			tracemalloc.start()
+		if hasattr(tracemalloc, 'reset_peak'):
+			tracemalloc.reset_peak()
+		else:
+			tracemalloc.clear_traces() # Python 3.8: also resets the peak
+
+	wall0  = time.perf_counter()
+	cpu0   = cpuTime()
+	result = fn(*args)
+	wall1  = time.perf_counter()
+	cpu1   = cpuTime()
+
+	if useRss:
+		peak = peakRss()
+	else:
+		peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+		if startTrace:
+			tracemalloc.stop()
+
+	dProfile['stages'].append(dict(
+		stage              = stage,
+		wall_s             = wall1 - wall0,
+		cpu_s              = cpu1 - cpu0,
+		peakMem_MB         = peak,
+		peakMethod         = 'rss' if useRss else 'tracemalloc',
+		childrenPeakRss_MB = childrenPeakRss(),
+	))
+
+	return result
+
+def writeProfile(fileName):
+	"""
+	Writes the profile of the run: stages, parse time per template, and the PROFILE_TOP slowest
+	router x template parse calls. As CSV if fileName ends in .csv (one section per row), JSON otherwise.
+	The memory of each template is that of its parsed results (result_MB); the peak memory while parsing
+	is only measured per stage, since the templates are parsed router by router, interleaved.
+	"""
+
+	dfCalls = pd.DataFrame(dProfile['calls'], columns=['router','template','wall_s','cpu_s','rows','result_MB'])
+
+	dfTmplt = dfCalls.groupby('template', sort=False).agg(
+		calls      = ('wall_s','size'),
+		rows       = ('rows','sum'),
+		wall_s     = ('wall_s','sum'),
+		cpu_s      = ('cpu_s','sum'),
+		maxWall_s  = ('wall_s','max'),
+		result_MB  = ('result_MB','sum'),
+	).reset_index().sort_values('wall_s', ascending=False)
+
+	dfSlowest = dfCalls[dfCalls['template'] != PROFILE_DISPATCH].sort_values('wall_s', ascending=False).head(PROFILE_TOP)
+	dfStages  = pd.DataFrame(dProfile['stages'], columns=['stage','wall_s','cpu_s','peakMem_MB','peakMethod','childrenPeakRss_MB'])
+
+	if fileName.endswith('.csv'):
+		dfAll = pd.concat([
+			dfStages.rename(columns={'stage':'name'}).assign(section='stage'),
+			dfTmplt.rename(columns={'template':'name'}).assign(section='template'),
+			dfSlowest.assign(section='call', name=dfSlowest['router'] + ' x ' + dfSlowest['template']).drop(columns=['router','template']),
+		], ignore_index=True)
+
+		dfAll = dfAll[['section','name','wall_s','cpu_s','peakMem_MB','peakMethod','childrenPeakRss_MB','calls','rows','maxWall_s','result_MB']]
+		dfAll.to_csv(fileName, index=False)
+	else:
+		dOut = dict(
+			stages       = dfStages.to_dict(orient='records'),
+			templates    = dfTmplt.to_dict(orient='records'),
+			slowestCalls = dfSlowest.to_dict(orient='records'),
+		)
+
+		with open(fileName, 'w') as f:
+			json.dump(dOut, f, indent=2, default=lambda x: x.item() if hasattr(x, 'item') else str(x))
+
+	print(f'\nProfile written in {fileName}')
+
+def runStatus(datosEquipoPre, datosEquipoPost, count_dif, searchMajor):
+	"""
+	Final status of each template (shortText of D_STATUS), as shown in the index of the report.
+	"""
+
+	dStatus = {}
+
+	for tmpltName in datosEquipoPre.keys():
+		parseStatus = datosEquipoPost[tmpltName]['parseStatus'] if datosEquipoPost is not None else datosEquipoPre[tmpltName]['parseStatus']
+		status      = detStatus(parseStatus, count_dif[tmpltName]['dfResultDatos'], searchMajor[tmpltName]['dfResultDatos'])
+
+		dStatus[tmpltName] = D_STATUS[status]['shortText']
+
+	return dStatus
+
+def fncRun(dictParam, dTemplates=None):
+	"""
+	Runs logChecker with the parameters of dictParam (see makeParams). dTemplates keeps the templates loaded
+	by previous runs (see loadTemplates and LogChecker).
+
+	Returns:
+		dict with the Excel report (report; None if not written) and the status of each template (status)
+	"""
 
 	preFolder          = dictParam['preFolder']
 	postFolder         = dictParam['postFolder']
@@ -1007,19 +2452,49 @@ def fncRun(dictParam):
 	templateFolderPost = dictParam['templateFolderPost']
 	routerId           = dictParam['routerId']
 	genAtp             = dictParam['genAtp']
-	idxComp             = dictParam['idxComp']
+	idxComp            = dictParam['idxComp']
+	workers            = dictParam['workers']
+	cacheDir           = dictParam['cacheDir']
+	cacheSize          = dictParam['cacheSize']
+	lowMemory          = dictParam['lowMemory']
+	outputFormat       = dictParam['outputFormat']
+	reportMode         = dictParam['reportMode']
+	profile            = dictParam['profile']
+	stateDir           = dictParam['stateDir']
+
+	# pandas is loaded here (see lazyImport), before any pool of processes is started, so that the
+	# forked processes don't import it again
+	pd.DataFrame
 
 	if _platform == "win64" or _platform == "win32":
 		templateFolder = templateFolder.replace('/', '\\')
 		if templateFolderPost != '':
 			templateFolderPost = templateFolderPost.replace('/','\\')
 
+	if cacheDir != '':
+		os.makedirs(cacheDir, exist_ok=True)
+
+	dProfile['enabled'] = profile != ''
+	dProfile['stages']  = []
+	dProfile['calls']   = []
+
+	dResult = dict(report=None, status={})
+
+	if stateDir != '':
+		os.makedirs(stateDir, exist_ok=True)
+		statePre  = os.path.join(stateDir, 'state_pre.pkl')
+		statePost = os.path.join(stateDir, 'state_post.pkl')
+		stateDiff = os.path.join(stateDir, 'state_diff.pkl')
+	else:
+		statePre  = ''
+		statePost = ''
+		stateDiff = ''
+
 	if preFolder != '' and postFolder == '':
 
-		dTmplt = readTemplate(csvTemplate, templateFolder, templateEngine)
-		dLog   = readLog(preFolder, formatJson)
+		dTmplt = runStage('readTemplate', loadTemplates, dTemplates, csvTemplate, templateFolder, templateEngine)
 
-		df_final    = parseResults(dTmplt, dLog, templateFolder, templateEngine, routerId)
+		df_final    = runStage('parseResults', parseFolder, dTmplt, preFolder, formatJson, templateFolder, templateEngine, routerId, workers, cacheDir, statePre)
 		count_dif   = {}
 		searchMajor = {}
 
@@ -1031,50 +2506,271 @@ def fncRun(dictParam):
 				searchMajor[tmpltName] = {}
 			searchMajor[tmpltName]['dfResultDatos'] = pd.DataFrame(columns=df_final[tmpltName]['dfResultDatos'].columns)
 
-		constructExcel(df_final, count_dif, searchMajor, preFolder)
+		if 'xlsx' in outputFormat:
+			runStage('constructExcel', constructExcel, df_final, count_dif, searchMajor, preFolder, lowMemory, reportMode)
+			dResult['report'] = preFolder[:-1] + '.xlsx'
+
+		dResult['status'] = runStatus(df_final, None, count_dif, searchMajor)
+
+		tableFormat = [x for x in outputFormat if x != 'xlsx']
+		if len(tableFormat) > 0:
+			runStage('exportTables', exportTables, df_final, None, count_dif, searchMajor, preFolder, tableFormat)
 
 		if genAtp is True:
-			renderAtp(dictParam)
+			runStage('renderAtp', renderAtp, dictParam)
 
 	elif preFolder != '' and postFolder != '':
 
-		if templateFolder == templateFolderPost:
-			dTmpltPre  = readTemplate(csvTemplate, templateFolder, templateEngine)
-			dTmpltPost = readTemplate(csvTemplate, templateFolderPost, templateEngine)
-		elif templateFolder != '' and templateFolderPost == '':
+		if templateFolder != '' and templateFolderPost == '':
 			templateFolderPost = templateFolder
-			dTmpltPre  = readTemplate(csvTemplate, templateFolder, templateEngine)
-			dTmpltPost = readTemplate(csvTemplate, templateFolderPost, templateEngine)
+
+		dTmpltPre = runStage('readTemplate', loadTemplates, dTemplates, csvTemplate, templateFolder, templateEngine)
+
+		if templateFolder == templateFolderPost:
+			# Same folder: the templates are loaded only once and shared by PRE and POST
+			dTmpltPost = dTmpltPre
 		else:
-			dTmpltPre  = readTemplate(csvTemplate, templateFolder, templateEngine)
-			dTmpltPost = readTemplate(csvTemplate, templateFolderPost, templateEngine)
-
-		dLogPre  = readLog(preFolder, formatJson)
-		dLogPost = readLog(postFolder, formatJson)
-			
-		datosEquipoPre  = parseResults(dTmpltPre,  dLogPre,  templateFolder,     templateEngine, routerId)
-		datosEquipoPost = parseResults(dTmpltPost, dLogPost, templateFolderPost, templateEngine, routerId)
+			dTmpltPost = runStage('readTemplate (post)', loadTemplates, dTemplates, csvTemplate, templateFolderPost, templateEngine)
+
+		# PRE and POST are independent until searchDiffAll: PRE is always parsed in another (forked) process,
+		# which sends its results back pickled, while POST is parsed here. The workers are split between both
+		# sides, so that they add up to -w (POST gets the odd one).
+		preWorkers  = max(1, workers // 2)
+		postWorkers = max(1, workers - workers // 2)
+
+		if dProfile['enabled']:
+			# When profiling, PRE and POST are parsed one after the other, in this process, so that each
+			# one is measured on its own, and the parse calls are recorded in this process.
+			datosEquipoPre  = runStage('parseResults (pre)', parseFolder, dTmpltPre, preFolder, formatJson, templateFolder, templateEngine, routerId, workers, cacheDir, statePre)
+			datosEquipoPost = runStage('parseResults (post)', parseFolder, dTmpltPost, postFolder, formatJson, templateFolderPost, templateEngine, routerId, workers, cacheDir, statePost)
+		else:
+			# Where processes can be forked, the PRE process inherits the templates with their compiled parsers.
+			# Elsewhere, they are sent without the parsers, and compiled again in the new process.
+			if 'fork' in multiprocessing.get_all_start_methods():
+				mpContext           = multiprocessing.get_context('fork')
+				dWorker['dTmplPre'] = dTmpltPre
+				dTmplSend           = None
+			else:
+				mpContext           = None
+				dTmplSend           = copyTemplates(dTmpltPre)
+
+			# The messages of both sides are kept, and printed once both are parsed: PRE first, then POST
+			try:
+				with ProcessPoolExecutor(max_workers=1, mp_context=mpContext) as pool:
+					futurePre                = pool.submit(parseFolderPre, dTmplSend, preFolder, formatJson, templateFolder, templateEngine, routerId, preWorkers, cacheDir, statePre)
+					datosEquipoPost, logPost = captureOutput(parseFolder, dTmpltPost, postFolder, formatJson, templateFolderPost, templateEngine, routerId, postWorkers, cacheDir, statePost)
+					datosEquipoPre, logPre   = futurePre.result()
+			finally:
+				dWorker.pop('dTmplPre', None)
+
+			print(logPre + logPost, end='')
 		
-		count_dif       = searchDiffAll(datosEquipoPre, datosEquipoPost, dTmpltPre, routerId, idxComp)
+		if stateDiff != '':
+			count_dif, searchMajor = runStage('searchDiffState', searchDiffState, datosEquipoPre, datosEquipoPost, dTmpltPre, routerId, idxComp, stateDiff)
+		else:
+			count_dif       = runStage('searchDiffAll', searchDiffAll, datosEquipoPre, datosEquipoPost, dTmpltPre, routerId, idxComp)
+
+			searchMajor     = runStage('findMajor', findMajor, count_dif, dTmpltPre, routerId, datosEquipoPre)
 
-		searchMajor     = findMajor(count_dif, dTmpltPre, routerId, datosEquipoPre)
-		df_final        = makeTable(datosEquipoPre, datosEquipoPost)
+		tableFormat = [x for x in outputFormat if x != 'xlsx']
+		if len(tableFormat) > 0:
+			runStage('exportTables', exportTables, datosEquipoPre, datosEquipoPost, count_dif, searchMajor, postFolder, tableFormat)
 
-		constructExcel(df_final, count_dif, searchMajor, postFolder)
+		if 'xlsx' in outputFormat:
+			df_final    = runStage('makeTable', makeTable, datosEquipoPre, datosEquipoPost)
+			runStage('constructExcel', constructExcel, df_final, count_dif, searchMajor, postFolder, lowMemory, reportMode)
+			dResult['report'] = postFolder[:-1] + '.xlsx'
+
+		dResult['status'] = runStatus(datosEquipoPre, datosEquipoPost, count_dif, searchMajor)
 
 		if genAtp is True:
-			renderAtp(dictParam)
+			runStage('renderAtp', renderAtp, dictParam)
 
 	elif preFolder == '':
 		print('No PRE folder defined. Please Verify.')
 
+	if cacheDir != '':
+		runStage('evictCache', evictCache, cacheDir, cacheSize)
 
+	if profile != '':
+		writeProfile(profile)
 
-def main():
-	start_time = time.time()
+	return dResult
+
+
+class LogChecker:
+	"""
+	Python API of logChecker. The templates, with their compiled parsers, are loaded by the first run and
+	kept for the next ones (see loadTemplates), so each run only reads and parses the logs.
+
+		lc     = LogChecker(templateFolder='Templates/')
+		result = lc.run(preFolder='pre/', postFolder='post/')
+
+	The parameters are those of makeParams (the keys of dictParam). The ones given to LogChecker are the
+	defaults of every run, and can be overridden in run().
+	"""
+
+	def __init__(self, **params):
+
+		self.dictParam  = defaultParams()
+		self.dTemplates = {}
+
+		self.dictParam.update(self.checkParams(params))
+
+	def checkParams(self, params):
+		"""
+		Checks the parameters of a run against the options of the CLI (makeParser), and normalizes them
+		as makeParams does: yes/no become bool, a single output format becomes a list, and workers and
+		atpSize are at least 1.
+
+		Returns:
+			dict with the normalized parameters
+		"""
+
+		unknown = [x for x in params.keys() if x not in self.dictParam]
+		if len(unknown) > 0:
+			raise TypeError(f'Unknown parameters of logChecker: {unknown}')
+
+		dAction = {x.dest: x for x in makeParser()._actions}
+		dParam  = {}
+
+		for key, value in params.items():
+
+			action = dAction[key]
+
+			if isinstance(self.dictParam[key], bool):
+				# yes/no options of the CLI
+				if value in ['yes','no']:
+					value = value == 'yes'
+				if not isinstance(value, bool):
+					raise ValueError(f"Parameter {key} must be 'yes', 'no' or a bool, not {value!r}")
+
+			elif action.nargs == '+':
+				if isinstance(value, str):
+					value = [value]
+				if not isinstance(value, (list, tuple)) or len(value) == 0 or not all(isinstance(x, str) for x in value):
+					raise ValueError(f'Parameter {key} must be a string or a list of strings, not {value!r}')
+				value = list(value)
+
+			elif action.type is int:
+				if isinstance(value, bool) or not isinstance(value, int):
+					raise ValueError(f'Parameter {key} must be an int, not {value!r}')
+
+			elif not isinstance(value, str):
+				raise ValueError(f'Parameter {key} must be a string, not {value!r}')
+
+			if action.choices is not None and not isinstance(value, bool):
+				wrong = [x for x in (value if isinstance(value, list) else [value]) if x not in action.choices]
+				if len(wrong) > 0:
+					raise ValueError(f'Parameter {key} must be one of {list(action.choices)}, not {value!r}')
+
+			if key in ['workers','atpSize']:
+				value = max(1, value)
+
+			dParam[key] = value
+
+		return dParam
+
+	def run(self, **params):
+		"""
+		Runs logChecker. See fncRun.
+
+		Returns:
+			dict with the Excel report (report) and the status of each template (status)
+		"""
+
+		dictParam = dict(self.dictParam, **self.checkParams(params))
+
+		return fncRun(dictParam, self.dTemplates)
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+	"""
+	A job of the daemon: a JSON line with the working folder of the client (cwd) and the parameters of the
+	run (params), answered with a JSON line with the result of the run (ok, result, log) or the error.
+	"""
+
+	def handle(self):
+
+		cwd  = os.getcwd()
+		log  = io.StringIO()
+		dJob = {}
+
+		try:
+			dJob = json.loads(self.rfile.readline())
+			os.chdir(dJob['cwd'])
+
+			with contextlib.redirect_stdout(log):
+				result = self.server.logChecker.run(**dJob['params'])
+
+			dOut = dict(ok=True, result=result)
+
+		except (Exception, SystemExit) as e: # quit() raises SystemExit
+			dOut = dict(ok=False, error=f'{type(e).__name__}: {e}')
+
+		finally:
+			os.chdir(cwd)
+
+		dOut['log'] = log.getvalue()
+
+		self.wfile.write((json.dumps(dOut, default=str) + '\n').encode())
+
+		print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} job {'done' if dOut['ok'] else 'failed'}: {dJob.get('params')}")
+
+def serveDaemon(socketPath, dictParam):
+	"""
+	Runs logChecker as a daemon, listening on the Unix socket socketPath. The jobs are run one after the
+	other by a single LogChecker object, so the modules are imported and the templates loaded only once.
+	dictParam has the defaults of the jobs.
+	"""
+
+	if not hasattr(socketserver, 'UnixStreamServer'):
+		print('The daemon needs Unix sockets, which are not available in this platform.\nQuitting...')
+		quit()
+
+	if os.path.exists(socketPath):
+		os.remove(socketPath) # Left by a previous daemon
+
+	# Only the user running the daemon can send it jobs: a job chooses the folders (cwd, stateDir, cacheDir)
+	# from which the daemon loads pickled results. The umask keeps the socket private while it is created.
+	oldMask = os.umask(0o177)
+	try:
+		server = socketserver.UnixStreamServer(socketPath, DaemonHandler)
+	finally:
+		os.umask(oldMask)
+	os.chmod(socketPath, 0o600)
+
+	server.logChecker = LogChecker(**dictParam)
+
+	print(f'##### logChecker daemon listening on {socketPath} #####')
+
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		os.remove(socketPath)
+
+def callDaemon(socketPath, **params):
+	"""
+	Sends a job to the daemon listening on socketPath. params overrides the defaults of the daemon; relative
+	folders are taken from the current folder.
+
+	Returns:
+		dict with ok, result (see fncRun) or error, and the output of the run (log)
+	"""
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+		sock.connect(socketPath)
+		sock.sendall((json.dumps(dict(cwd=os.getcwd(), params=params)) + '\n').encode())
+
+		with sock.makefile('rb') as f:
+			return json.loads(f.readline())
+
+def makeParser():
 
 	parser1 = argparse.ArgumentParser(description='Log Analysis', prog='PROG', usage='%(prog)s [options]')
-	parser1.add_argument('-pre', '--preFolder',     type=str, required=True, help='Folder with PRE Logs. Must end in "/"',)
+	parser1.add_argument('-pre', '--preFolder',     type=str, default='',    help='Folder with PRE Logs. Must end in "/". Required, unless running the daemon (-sv).',)
 	parser1.add_argument('-post','--postFolder' ,   type=str, default='',    help='Folder with POST Logs. Must end in "/"',)
 	parser1.add_argument('-csv', '--csvTemplate',   type=str, default='', help='CSV with list of templates names to be used in parsing. If the file is omitted, then all the templates inside --templateFolder, will be considered for parsing. Default=None.')
 	parser1.add_argument('-json', '--formatJson',   type=str, default = 'yes', choices=['yes','no'], help='logs in json format: yes or no. Default=yes.')
@@ -1084,11 +2780,29 @@ def main():
 	parser1.add_argument('-ri', '--routerId',       choices=['name','ip','both'], default='name', type=str, help='Router Id to be used within the tables in the Excel report. Default=name.')
 	parser1.add_argument('-ga', '--genAtp',         type=str, help='Generate ATP document in docx format, based on the contents of the json files from taskAutom. Default=no', default='no', choices=['no','yes'])
 	parser1.add_argument('-ic','--idxComp',       type=str, default= 'no', choices=['yes','no'], help='Adds new column (Idx Pre/Post) in changes detected table with . Default=no')
-	parser1.add_argument('-v'  ,'--version',        help='Version', action='version', version='(c) 2024 - Version: 4.5.6' )
-
-	args = parser1.parse_args()
+	parser1.add_argument('-w', '--workers',         type=int, default=1, help='Number of processes used to parse the logs of the routers. With -post, they are split between PRE and POST, and PRE is always parsed in a separate process, whose results are sent back pickled. Default=1.')
+	parser1.add_argument('-cd', '--cacheDir',       type=str, default='', help='Folder where parsed results are cached, to be reused in later runs. If omitted, no cache is used. Default=None.')
+	parser1.add_argument('-cs', '--cacheSize',      type=int, default=1024, help='Maximum size of the cache folder, in MB. The least recently used entries are removed. Default=1024.')
+	parser1.add_argument('-lm','--lowMemory',       type=str, default='no', choices=['yes','no'], help='Writes the Excel report row by row to disk, with bounded memory. Useful for very large reports. Default=no')
+	parser1.add_argument('-of','--outputFormat',    type=str, default=['xlsx'], nargs='+', choices=['xlsx','parquet','feather'], help='Output formats. parquet and feather write the tables of each template in columnar files, with a manifest, and require pyarrow. Default=xlsx')
+	parser1.add_argument('-rm','--reportMode',      type=str, default='full', choices=['full','summary'], help='With summary, templates with status Ok! are only listed in the index, with their number of rows, and have no tab in the Excel report. Default=full')
+	parser1.add_argument('-as','--atpSplit',        type=str, default='no', choices=['no','router','size'], help='Split the ATP in several documents, inside the folder ATP/, with an index document: one per router, or one each time the size set by -az is reached. Default=no')
+	parser1.add_argument('-az','--atpSize',         type=int, default=20, help='Size, in MB, of each document of the ATP when using -as size. Default=20')
+	parser1.add_argument('-st','--stateDir',        type=str, default='', help='Folder where the parsed results of each router, and the comparison of each template, are kept between runs. If set, only the routers whose logs changed since the previous run are parsed, and only the templates whose tables changed are compared. Default=None')
+	parser1.add_argument('-pf','--profile',         type=str, default='', help='File where the profile of the run is written: wall time, CPU time and peak memory per stage, parse time per template, and the slowest router x template parse calls. CSV if the name ends in .csv, JSON otherwise. Default=None')
+	parser1.add_argument('-cp','--cProfile',        type=str, default='', help='File where the statistics of cProfile are written (see pstats). Default=None')
+	parser1.add_argument('-sv','--serve',           type=str, default='', help='Runs logChecker as a daemon, listening on this Unix socket. Templates are loaded once and kept between jobs. The other parameters are the defaults of the jobs. Default=None')
+	parser1.add_argument('-dm','--daemon',          type=str, default='', help='Sends the job to the daemon listening on this Unix socket (see -sv), instead of running it in this process. Default=None')
+	parser1.add_argument('-v'  ,'--version',        help='Version', action='version', version='(c) 2024 - Version: 4.6.0' )
+
+	return parser1
+
+def makeParams(args):
+	"""
+	dictParam of fncRun, from the CLI arguments.
+	"""
 
-	dictParam = dict(
+	return dict(
 		preFolder          = args.preFolder,
 		postFolder         = args.postFolder,
 		csvTemplate        = args.csvTemplate,
@@ -1099,9 +2813,69 @@ def main():
 		routerId           = args.routerId,
 		genAtp             = True if args.genAtp == 'yes' else False,
 		idxComp            = True if args.idxComp == 'yes' else False,
+		workers            = max(1, args.workers),
+		cacheDir           = args.cacheDir,
+		cacheSize          = args.cacheSize,
+		lowMemory          = True if args.lowMemory == 'yes' else False,
+		outputFormat       = args.outputFormat,
+		reportMode         = args.reportMode,
+		atpSplit           = args.atpSplit,
+		atpSize            = max(1, args.atpSize),
+		profile            = args.profile,
+		stateDir           = args.stateDir,
 	)
 
-	fncRun(dictParam)
+def defaultParams():
+	"""
+	dictParam with the default value of every parameter.
+	"""
+
+	return makeParams(makeParser().parse_args(['-pre', '']))
+
+def typedParams(argv=None):
+	"""
+	Names of the parameters set in the CLI (argv, or sys.argv if None), even if set to their default value.
+	The arguments are parsed again, without defaults, so only the options given are in the result.
+	"""
+
+	parser1 = makeParser()
+
+	for action in parser1._actions:
+		action.default = argparse.SUPPRESS
+
+	return list(vars(parser1.parse_args(argv)).keys())
+
+def main():
+	start_time = time.time()
+
+	parser1   = makeParser()
+	args      = parser1.parse_args()
+	dictParam = makeParams(args)
+
+	if args.serve != '':
+		serveDaemon(args.serve, dictParam)
+		return
+
+	if args.preFolder == '':
+		parser1.error('the following arguments are required: -pre/--preFolder')
+
+	if args.daemon != '':
+		# Only the parameters set in the CLI are sent; the others are the defaults of the daemon
+		typed = typedParams()
+		dOut  = callDaemon(args.daemon, **{k: v for k, v in dictParam.items() if k in typed})
+
+		print(dOut['log'], end='')
+
+		if not dOut['ok']:
+			print(f"The daemon could not run the job: {dOut['error']}")
+
+	elif args.cProfile != '':
+		profiler = cProfile.Profile()
+		profiler.runcall(fncRun, dictParam)
+		profiler.dump_stats(args.cProfile)
+		print(f'cProfile statistics written in {args.cProfile}')
+	else:
+		fncRun(dictParam)
 
 	print(f'\nTotal running time: {time.time()-start_time:.2f} seconds')
 